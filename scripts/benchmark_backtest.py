@@ -0,0 +1,91 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.backtesting.engine import BacktestEngine
+from src.core.risk_manager import RiskManager
+
+def make_synthetic_data(bars, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 0.5, bars))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.3, bars))
+    return pd.DataFrame({
+        'Time': pd.date_range('2020-01-01', periods=bars, freq='15min'),
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 1000, bars)
+    })
+
+class PeriodicStrategy:
+    """Enters every `period` bars and exits `hold` bars later; cheap enough that the engine loop dominates."""
+    def __init__(self, period, hold=5):
+        self.period = period
+        self.hold = hold
+        self.entry_index = None
+
+    def should_enter_at(self, i):
+        if i % self.period == self.period - 1:
+            self.entry_index = i
+            return True
+        return False
+
+    def should_exit_at(self, i):
+        if self.entry_index is not None and i - self.entry_index >= self.hold:
+            return {"reason": "Holding period elapsed"}
+        return False
+
+    def should_enter(self, row):
+        return self.should_enter_at(row.name)
+
+    def should_exit(self, row):
+        return self.should_exit_at(row.name)
+
+    def calculate_position_size(self, entry_price):
+        return 0.01
+
+class _NullMemory:
+    def __init__(self):
+        self.buffer = []
+
+    def clear(self):
+        self.buffer.clear()
+
+class _NullAgent:
+    def __init__(self):
+        self.memory = _NullMemory()
+
+class _NullEnv:
+    balance = 0
+
+def run(data, mode, symbol):
+    # Trades are spread so the 10-trade cap is reached near the end of the data.
+    strategy = PeriodicStrategy(period=len(data) // 11)
+    risk_manager = RiskManager(account_balance=10000, risk_per_trade=0.01)
+    engine = BacktestEngine(strategy, data, 10000, risk_manager, _NullAgent(), _NullEnv(), symbol)
+    start = time.perf_counter()
+    engine.run_backtest(mode=mode)
+    return time.perf_counter() - start, engine
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the iterrows and array backtest loops')
+    parser.add_argument('--bars', type=int, default=150000)
+    parser.add_argument('--symbol', default='XAUUSDm')
+    args = parser.parse_args()
+
+    data = make_synthetic_data(args.bars)
+    rows_time, rows_engine = run(data, 'rows', args.symbol)
+    arrays_time, arrays_engine = run(data, 'arrays', args.symbol)
+
+    same_trades = rows_engine.results == arrays_engine.results
+    same_equity = rows_engine.equity_curve == arrays_engine.equity_curve
+    print(f"Bars: {len(data)}")
+    print(f"rows:   {rows_time:.3f}s ({len(rows_engine.results)} trades)")
+    print(f"arrays: {arrays_time:.3f}s ({len(arrays_engine.results)} trades)")
+    print(f"Speedup: {rows_time / arrays_time:.1f}x")
+    print(f"Identical trades: {same_trades} | Identical equity curve: {same_equity}")
+
+if __name__ == "__main__":
+    main()
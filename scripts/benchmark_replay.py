@@ -0,0 +1,72 @@
+import argparse
+import time
+import numpy as np
+import tensorflow as tf
+from src.reinforcement.agent import DQNAgent
+
+def make_agent(state_size, batch_size, memory_size, seed=0):
+    tf.keras.utils.set_random_seed(seed)
+    config = {
+        "memory_size": memory_size,
+        "discount_factor": 0.99,
+        "exploration_strategy": {"initial_epsilon": 1.0, "final_epsilon": 0.01, "decay_steps": 10000},
+        "batch_size": batch_size,
+        "update_target_frequency": 1000,
+        "learning_rate": 0.001
+    }
+    agent = DQNAgent(state_size=state_size, action_size=3, config=config, model_path="/nonexistent/dqn_model.keras")
+    rng = np.random.default_rng(seed)
+    for _ in range(memory_size):
+        agent.remember(
+            rng.normal(size=state_size).astype(np.float32), int(rng.integers(3)), float(rng.normal(0, 0.01)),
+            rng.normal(size=state_size).astype(np.float32), bool(rng.random() < 0.01)
+        )
+    return agent
+
+def _targets(agent, states, actions, rewards, next_states, dones):
+    next_q = agent.target_model.predict_on_batch(next_states)
+    targets = np.array(agent.model.predict_on_batch(states))
+    targets[np.arange(len(states)), actions] = np.where(dones, rewards, rewards + agent.gamma * np.max(next_q, axis=1))
+    return targets
+
+def fit_update(agent):
+    """The previous update: a fresh tf.data.Dataset and model.fit per replay."""
+    (states, actions, rewards, next_states, dones), _, weights = agent.memory.sample(agent.batch_size)
+    targets = _targets(agent, states, actions, rewards, next_states, dones)
+    dataset = tf.data.Dataset.from_tensor_slices((states, targets, weights)).batch(agent.batch_size)
+    agent.model.fit(dataset, epochs=1, verbose=0)
+
+def train_on_batch_update(agent):
+    (states, actions, rewards, next_states, dones), _, weights = agent.memory.sample(agent.batch_size)
+    targets = _targets(agent, states, actions, rewards, next_states, dones)
+    agent.model.train_on_batch(states, targets, sample_weight=weights)
+
+def compiled_update(agent):
+    agent.replay()
+
+def run(update, agent, updates, warmup=5):
+    for _ in range(warmup):
+        update(agent)
+    start = time.perf_counter()
+    for _ in range(updates):
+        update(agent)
+    return updates / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare replay update throughput')
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--state-size', type=int, default=52)
+    parser.add_argument('--memory-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    agent = make_agent(args.state_size, args.batch_size, args.memory_size)
+    baseline = None
+    for name, update in (('model.fit', fit_update), ('train_on_batch', train_on_batch_update),
+                         ('tf.function', compiled_update)):
+        rate = run(update, agent, args.updates)
+        baseline = baseline or rate
+        print(f"{name:15s} {rate:8.1f} updates/s ({rate / baseline:.1f}x)")
+
+if __name__ == "__main__":
+    main()
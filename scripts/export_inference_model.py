@@ -0,0 +1,23 @@
+import argparse
+import os
+import tensorflow as tf
+from src.reinforcement.inference import DenseNetwork, PRECISIONS
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a Keras DQN model to an .npz for the TensorFlow-free InferenceAgent')
+    parser.add_argument('--model', default='models/dqn_model.keras')
+    parser.add_argument('--output', default=None, help='defaults to the model path with an .npz extension')
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32',
+                        help='storage precision of the dense weights; int8 uses one scale per layer')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + '.npz'
+    # Only the weights are needed, so the saved optimizer state is not restored
+    model = tf.keras.models.load_model(args.model, compile=False)
+    network = DenseNetwork.from_keras(model)
+    network.save(output, args.precision)
+    print(f"Exported {len(network.weights)} {args.precision} dense layers ({network.input_size} inputs, "
+          f"{network.output_size} actions) to {output} ({os.path.getsize(output) / 1024:.1f} KiB)")
+
+if __name__ == "__main__":
+    main()
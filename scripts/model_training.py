@@ -1,17 +1,23 @@
+import os
 import yaml
 import pandas as pd
 from src.reinforcement.agent import DQNAgent
 from src.reinforcement.environment import TradingEnvironment
 from src.utils.logger import Logger
-from src.utils.feature_engineering import add_technical_indicators
+from src.utils.feature_store import FeatureStore
 
 def load_config():
     with open('config/rl_config.yaml', 'r') as file:
         return yaml.safe_load(file)
 
-def prepare_data(symbol):
-    historical_data = pd.read_csv(f'data/historical/{symbol}.csv')
-    return add_technical_indicators(historical_data)
+def prepare_data(symbol, timeframe='H1', store=None):
+    # Features are memory-mapped from the store; the CSV is only parsed when it changed since the last update
+    store = store or FeatureStore()
+    csv_path = f'data/historical/{symbol}.csv'
+    if store.exists(symbol, timeframe) and os.path.getmtime(csv_path) <= store.metadata(symbol, timeframe)['updated']:
+        return store.read(symbol, timeframe)
+    historical_data = pd.read_csv(csv_path)
+    return store.update(symbol, timeframe, historical_data)
 
 def main():
     config = load_config()
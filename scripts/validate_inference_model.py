@@ -0,0 +1,50 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from src.reinforcement.environment import TradingEnvironment
+from src.reinforcement.inference import DenseNetwork, PRECISIONS, action_agreement
+
+def load_bars(path):
+    # MT5 exports use lowercase columns and tick_volume
+    data = pd.read_csv(path)
+    data = data.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'})
+    if 'Volume' not in data and 'tick_volume' in data:
+        data['Volume'] = data['tick_volume']
+    return data
+
+def holdout_states(data, holdout, window_size):
+    """Observations of the last `holdout` share of bars, once per position (short, flat, long)."""
+    data = data.iloc[int(len(data) * (1 - holdout)):].reset_index(drop=True)
+    env = TradingEnvironment(data, window_size=window_size)
+    observations = env.get_observation_matrix()[window_size:]
+    states = np.repeat(observations[None], 3, axis=0)
+    states[:, :, -1] = np.array([-1, 0, 1])[:, None]
+    return states.reshape(-1, observations.shape[1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Report how often reduced-precision models pick the float32 action')
+    parser.add_argument('--reference', default='models/dqn_model.npz', help='float32 export of the model')
+    parser.add_argument('--data', required=True, help='CSV of OHLCV bars; the last --holdout share is used')
+    parser.add_argument('--holdout', type=float, default=0.2)
+    parser.add_argument('--window-size', type=int, default=10)
+    parser.add_argument('--precisions', nargs='*', choices=PRECISIONS, default=['float16', 'int8'],
+                        help='quantize the reference in memory at these precisions')
+    parser.add_argument('--candidates', nargs='*', default=[], help='exported .npz files to compare as well')
+    args = parser.parse_args()
+
+    reference = DenseNetwork.load(args.reference)
+    states = holdout_states(load_bars(args.data), args.holdout, args.window_size)
+    if states.shape[1] != reference.input_size:
+        raise ValueError(f"Observations have {states.shape[1]} features but the model expects {reference.input_size}")
+
+    candidates = [(precision, reference.quantized(precision)) for precision in args.precisions]
+    candidates += [(os.path.basename(path), DenseNetwork.load(path)) for path in args.candidates]
+
+    print(f"{len(states)} held-out states")
+    for name, candidate in candidates:
+        agreement, max_error = action_agreement(reference, candidate, states)
+        print(f"{name:20s} action agreement {agreement:.4%} | max |dQ| {max_error:.2e}")
+
+if __name__ == "__main__":
+    main()
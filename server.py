@@ -28,7 +28,6 @@ from src.core.orb_strategy import OpeningRangeBreakout
 from src.core.risk_manager import RiskManager
 from src.core.pattern_detector import PatternDetector
 from src.core.sr_levels import SupportResistance as SRLevels
-from src.reinforcement.agent import DQNAgent
 from src.reinforcement.environment import TradingEnvironment
 import MetaTrader5 as mt5
 
@@ -378,6 +377,8 @@ async def run_backtest(request: BacktestRequest):
         sr_levels = SRLevels(symbol=request.symbol, timeframe=mt5.TIMEFRAME_M15)
         
         env = TradingEnvironment(historical_data, initial_balance=10000)
+        # Imported here so the API server only loads TensorFlow when a backtest needs it
+        from src.reinforcement.agent import DQNAgent
         agent = DQNAgent(state_size=env.observation_space.shape[0], action_size=env.action_space.n, config={
             "memory_size": 1000,
             "discount_factor": 0.95,
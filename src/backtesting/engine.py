@@ -1,11 +1,13 @@
+import numpy as np
 import pandas as pd
 from src.utils.logger import Logger
+from src.backtesting.features import bar_arrays
 import matplotlib.pyplot as plt
 
 logger = Logger('backtest_reports/trading_bot.log')
 
 class HybridStrategyWrapper:
-    def __init__(self, orb_strategy, risk_manager, pattern_detector, sr_levels, rl_agent, env, historical_data, symbol):
+    def __init__(self, orb_strategy, risk_manager, pattern_detector, sr_levels, rl_agent, env, historical_data, symbol, features=None):
         self.orb_strategy = orb_strategy
         self.risk_manager = risk_manager
         self.pattern_detector = pattern_detector
@@ -17,25 +19,106 @@ class HybridStrategyWrapper:
         self.last_entry_signal = None
         self.last_action = 0
         self.symbol = symbol
+        self.features = features
+        self.precomputed_actions = None
+        self.opening_ranges = None
+        self.signals = None
+
+    def precompute_opening_ranges(self):
+        """
+        Builds the per-session opening range once so entries compare each bar
+        with its own session's range instead of the first bar ever seen.
+        """
+        self.opening_ranges = self.orb_strategy.opening_range_arrays(self.historical_data)
+        return self.opening_ranges
+
+    def precompute_signals(self):
+        """
+        Evaluates the ORB setup and breakout rules for every bar in one pass over
+        the feature arrays, so entries only build a signal on breakout bars.
+        """
+        if self.features is None:
+            raise ValueError("precompute_signals requires BacktestFeatures")
+
+        bars = self.features.bars
+        or_high, or_low = self.precompute_opening_ranges()
+        self.signals = self.orb_strategy.generate_signals(
+            bars['Time'], bars['High'], bars['Low'], bars['Close'],
+            self.features.support, self.features.resistance, self.features.patterns,
+            or_high=or_high, or_low=or_low
+        )
+        return self.signals
+
+    def precompute_actions(self, chunk_size=4096, seed=None):
+        """
+        Scores every bar with one batched forward pass so entries and exits look
+        up the agent's action by bar index instead of calling predict per bar.
+        Epsilon-exploration is applied afterwards from a seeded RNG.
+        """
+        market_observations = self.features.market_observations if self.features is not None else None
+        observations = self.env.get_observation_matrix(market_observations)
+        window_size = self.env.window_size
+        actions = np.full(len(observations), -1, dtype=np.int64)
+
+        q_values = self.rl_agent.predict_q_values(observations[window_size:], chunk_size=chunk_size)
+        actions[window_size:] = np.argmax(q_values, axis=1)
+
+        rng = np.random.default_rng(seed)
+        explore = rng.random(len(actions)) < self.rl_agent.epsilon
+        random_actions = rng.integers(self.rl_agent.action_size, size=len(actions))
+        explore[:window_size] = False
+        actions[explore] = random_actions[explore]
+
+        self.precomputed_actions = actions
+        return actions
+
+    def _select_action(self, i):
+        if self.precomputed_actions is None:
+            state = self.env._get_observation_from_row(self.historical_data.iloc[i])
+            return self.rl_agent.select_action(state)
+
+        if i < self.env.window_size:
+            raise ValueError(f"Index {i} too small for window size {self.env.window_size}")
+        return self.precomputed_actions[i]
 
     def should_enter(self, row):
-        i = row.name
-        s_r_levels = self.sr_levels.get_sr_levels(row)
-        patterns = []
+        return self._should_enter(row.name, row)
 
-        if i >= 2:
-            window = self.historical_data.iloc[i - 2:i + 1]
-            patterns = self.pattern_detector.analyze_patterns(window)
+    def should_enter_at(self, i):
+        return self._should_enter(i, self._row(i))
 
-        if not self.orb_strategy.is_setup_valid(row, s_r_levels, patterns):
-            return False
+    def should_exit(self, row):
+        return self._should_exit(row.name, row)
+
+    def should_exit_at(self, i):
+        return self._should_exit(i, self._row(i))
+
+    def _row(self, i):
+        if self.features is not None:
+            return self.features.row(i)
+        return self.historical_data.iloc[i]
+
+    def _signal_at(self, i, row):
+        direction = self.signals['direction'][i]
+        if direction == 0:
+            return None
+        return {
+            'symbol': row.get('symbol', 'symbol'),
+            'direction': 'buy' if direction > 0 else 'sell',
+            'price': row['Close'],
+            'stop_loss': self.signals['stop_loss'][i],
+            'take_profit': self.signals['take_profit'][i]
+        }
 
-        signal = self.orb_strategy.get_entry_signal(row)
+    def _should_enter(self, i, row):
+        if self.signals is not None:
+            signal = self._signal_at(i, row)
+        else:
+            signal = self._entry_signal(i, row)
         if not signal:
             return False
 
-        state = self.env._get_observation_from_row(row)
-        action = self.rl_agent.select_action(state)
+        action = self._select_action(i)
 
         if action == 1:
             self.last_entry_signal = signal
@@ -48,12 +131,30 @@ class HybridStrategyWrapper:
 
         return False
 
-    def should_exit(self, row):
+    def _entry_signal(self, i, row):
+        if self.features is not None:
+            s_r_levels = self.features.sr_levels_at(i)
+            patterns = self.features.patterns_at(i)
+        else:
+            s_r_levels = self.sr_levels.get_sr_levels(row)
+            patterns = []
+            if i >= 2:
+                window = self.historical_data.iloc[i - 2:i + 1]
+                patterns = self.pattern_detector.analyze_patterns(window)
+
+        if not self.orb_strategy.is_setup_valid(row, s_r_levels, patterns):
+            return None
+
+        if self.opening_ranges is not None:
+            or_high, or_low = self.opening_ranges
+            return self.orb_strategy.get_entry_signal(row, or_high[i], or_low[i])
+        return self.orb_strategy.get_entry_signal(row)
+
+    def _should_exit(self, i, row):
         if not self.in_trade or not self.last_entry_signal:
             return False
 
-        state = self.env._get_observation_from_row(row)
-        action = self.rl_agent.select_action(state)
+        action = self._select_action(i)
 
         if action == 2:
             self.in_trade = False
@@ -70,7 +171,7 @@ class HybridStrategyWrapper:
         return self.risk_manager.calculate_lot_size(self.last_entry_signal, self.symbol)
 
 class BacktestEngine:
-    def __init__(self, strategy, historical_data, starting_balance, risk_manager, agent, env, symbol):
+    def __init__(self, strategy, historical_data, starting_balance, risk_manager, agent, env, symbol, features=None):
         self.strategy = strategy
         self.risk_manager = risk_manager
         self.historical_data = historical_data
@@ -84,8 +185,21 @@ class BacktestEngine:
         self.max_drawdown = 0
         self.peak_balance = starting_balance
         self.symbol = symbol
+        self.features = features
+
+    def run_backtest(self, mode='rows'):
+        """
+        Runs the backtest over `historical_data`.
+
+        mode='rows' walks the frame with iterrows(); mode='arrays' walks integer
+        indices over contiguous NumPy columns and produces the same trades and
+        equity curve.
+        """
+        if mode == 'arrays':
+            return self._run_backtest_arrays()
+        if mode != 'rows':
+            raise ValueError(f"Unknown backtest mode: {mode}")
 
-    def run_backtest(self):
         trade_count = 0
         max_trades = 10
         min_trades = 3
@@ -107,7 +221,7 @@ class BacktestEngine:
             if self.balance <= 0:
                 logger.log("❌ Account balance depleted or zero. Ending backtest early and resetting agent's rewards.")
                 self.env.balance = 0  # Simulate real environment balance collapse
-                self.agent.memory.buffer.clear()  # Clear experience memory for this episode
+                self.agent.memory.clear()  # Clear experience memory for this episode
                 self.equity_curve.append(self.balance)
                 break
 
@@ -137,9 +251,78 @@ class BacktestEngine:
         if not self.results:
             logger.log("⚠️ No trades were executed or retained during this backtest.")
 
+    def _run_backtest_arrays(self):
+        arrays = self._bar_arrays()
+        times = arrays['Time']
+        close = arrays['Close']
+        week_changed = arrays['week_changed']
+        weeks = arrays['week']
+        index_labels = self.historical_data.index
+
+        enter_at = getattr(self.strategy, 'should_enter_at', None)
+        exit_at = getattr(self.strategy, 'should_exit_at', None)
+        if enter_at is None:
+            enter_at = lambda i: self.strategy.should_enter(self.historical_data.iloc[i])
+        if exit_at is None:
+            exit_at = lambda i: self.strategy.should_exit(self.historical_data.iloc[i])
+
+        trade_count = 0
+        max_trades = 10
+        min_trades = 3
+        trades_this_week = 0
+
+        for i in range(len(close)):
+            if week_changed[i]:
+                if trades_this_week < min_trades:
+                    logger.log(f"⚠️ Agent took only {trades_this_week} trades in week {weeks[i - 1]}. Encourage more trades.")
+                trades_this_week = 0
+
+            # Balance only moves when a trade closes, so a scalar check here
+            # mirrors the per-row check of the iterrows loop.
+            if self.balance <= 0:
+                logger.log("❌ Account balance depleted or zero. Ending backtest early and resetting agent's rewards.")
+                self.env.balance = 0  # Simulate real environment balance collapse
+                self.agent.memory.clear()  # Clear experience memory for this episode
+                self.equity_curve.append(self.balance)
+                break
+
+            if trade_count >= max_trades:
+                logger.log("✅ Maximum number of trades reached. Ending backtest.")
+                break
+
+            if not self.in_trade and enter_at(i):
+                entry_price = close[i]
+                position_size = self.strategy.calculate_position_size(entry_price)
+                self._open_trade(entry_price, position_size, times[i])
+                logger.log(f'Trade({index_labels[i]}) entered at: {entry_price}, with lot size: {position_size}')
+                self.in_trade = True
+                trade_count += 1
+                trades_this_week += 1
+
+            if self.in_trade:
+                exit_signal = exit_at(i)
+                if isinstance(exit_signal, dict):
+                    exit_price = exit_signal.get("exit_price", close[i])
+                    self._close_trade(exit_price, times[i])
+                    logger.log(f'Trade exited at: {exit_price}')
+                    self.in_trade = False
+
+            self.equity_curve.append(self.balance)
+
+        if not self.results:
+            logger.log("⚠️ No trades were executed or retained during this backtest.")
+
+    def _bar_arrays(self):
+        if self.features is not None:
+            return self.features.bars
+        return bar_arrays(self.historical_data)
+
     def execute_trade(self, entry_price, position_size, row):
+        self._open_trade(entry_price, position_size, row['Time'])
+
+    def _open_trade(self, entry_price, position_size, entry_time):
         trade = {
-            'entry_time': row['Time'],
+            'entry_time': entry_time,
             'entry_price': entry_price,
             'position_size': position_size,
             'exit_price': None,
@@ -150,10 +333,13 @@ class BacktestEngine:
         self.results.append(trade)
 
     def close_trade(self, exit_price, row):
+        self._close_trade(exit_price, row['Time'])
+
+    def _close_trade(self, exit_price, exit_time):
         if self.results:
             trade = self.results[-1]
             trade['exit_price'] = exit_price
-            trade['exit_time'] = row['Time']
+            trade['exit_time'] = exit_time
 
             price_diff = exit_price - trade['entry_price']
             pip_multiplier, contract_size = self.risk_manager._get_multiplier_and_contract(self.symbol)
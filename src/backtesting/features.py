@@ -0,0 +1,74 @@
+from typing import Dict
+import numpy as np
+import pandas as pd
+from src.core.pattern_detector import PatternDetector
+from src.core.sr_levels import rolling_support_resistance
+from src.reinforcement.environment import market_observation_matrix
+
+
+def bar_arrays(historical_data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Pulls Time/OHLCV into contiguous arrays once, together with the ISO week
+    of every bar and a mask of the bars that open a new week.
+    """
+    arrays = {
+        col: np.ascontiguousarray(historical_data[col].to_numpy(dtype=np.float64))
+        for col in ['Open', 'High', 'Low', 'Close', 'Volume'] if col in historical_data
+    }
+    times = pd.DatetimeIndex(historical_data['Time'])
+    week = times.isocalendar().week.to_numpy(dtype=np.int64)
+    week_changed = np.zeros(len(week), dtype=bool)
+    week_changed[1:] = week[1:] != week[:-1]
+
+    arrays['Time'] = times
+    arrays['week'] = week
+    arrays['week_changed'] = week_changed
+    return arrays
+
+
+class BacktestFeatures:
+    """
+    Per-bar features of one dataset that do not depend on strategy parameters:
+    the Pattern bitmask, rolling support/resistance and the market part of the
+    RL observations. Build it once and hand it to every
+    HybridStrategyWrapper, BacktestEngine and optimizer run over that data.
+    """
+    def __init__(self, historical_data: pd.DataFrame, pattern_detector: PatternDetector = None,
+                 sr_window: int = 20, window_size: int = 10, chart_window: int = None):
+        self.historical_data = historical_data
+        self.sr_window = sr_window
+        self.chart_window = chart_window
+        self.window_size = window_size
+
+        self.bars = bar_arrays(historical_data)
+        self.patterns = self._pattern_mask(pattern_detector or PatternDetector())
+        self.support, self.resistance = self._rolling_sr_levels()
+        self.market_observations = market_observation_matrix(historical_data, window_size)
+
+    def __len__(self):
+        return len(self.historical_data)
+
+    def row(self, i: int) -> dict:
+        """Lightweight stand-in for `historical_data.iloc[i]` built from the bar arrays."""
+        return {
+            'Time': self.bars['Time'][i],
+            'Open': self.bars['Open'][i],
+            'High': self.bars['High'][i],
+            'Low': self.bars['Low'][i],
+            'Close': self.bars['Close'][i],
+            'Volume': self.bars['Volume'][i]
+        }
+
+    def patterns_at(self, i: int) -> int:
+        return int(self.patterns[i])
+
+    def sr_levels_at(self, i: int) -> Dict[str, float]:
+        return {'support': self.support[i], 'resistance': self.resistance[i]}
+
+    def _pattern_mask(self, pattern_detector: PatternDetector) -> np.ndarray:
+        # Patterns of bar i come from the three-bar window ending at i, as in HybridStrategyWrapper;
+        # chart patterns need six bars, so they are only added when a chart_window is given.
+        return pattern_detector.pattern_mask(self.historical_data, chart_window=self.chart_window)
+
+    def _rolling_sr_levels(self):
+        return rolling_support_resistance(self.bars['Low'], self.bars['High'], self.sr_window)
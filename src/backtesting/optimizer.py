@@ -1,35 +1,96 @@
-from typing import List, Dict, Any, Generator, Tuple
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Generator, Optional, Tuple
 import numpy as np
 import pandas as pd
 
+_worker_optimizer = None
+
+
+def _init_worker(historical_data, symbol, timeframe, account_balance, features):
+    # Import TensorFlow and the strategy stack once per worker; each parameter
+    # set then only rebuilds the agent.
+    global _worker_optimizer
+    import tensorflow  # noqa: F401
+    import src.reinforcement.agent  # noqa: F401
+    import src.backtesting.engine  # noqa: F401
+    _worker_optimizer = StrategyOptimizer(historical_data, symbol, timeframe, account_balance, features=features)
+
+
+def _run_param_set(params, metric, seed):
+    return _worker_optimizer._backtest(params, metric, seed=seed)
+
 
 class StrategyOptimizer:
-    def __init__(self, historical_data: pd.DataFrame, symbol: str, timeframe: str, account_balance, logger=None):
+    def __init__(self, historical_data: pd.DataFrame, symbol: str, timeframe: str, account_balance, logger=None, features=None):
         self.historical_data = historical_data
+        self.features = features
         self.account_balance = account_balance
         self.symbol = symbol
         self.timeframe = timeframe
         self.logger = logger
 
-    def optimize(self, parameter_grid: Dict[str, List[Any]], metric: str = 'sharpe') -> Dict[str, Any]:
-        best_score = -np.inf
-        best_params = {}
-        self.logger and self.logger.log(f"[OPTIMIZER] Starting optimization using metric: {metric}")
-
-        for idx, params in enumerate(self._generate_parameter_combinations(parameter_grid), 1):
-            self.logger and self.logger.log(f"\n[OPTIMIZER] --- Running Param Set {idx} ---\n{params}")
-            score, stats = self._backtest(params, metric)
+    def optimize(self, parameter_grid: Dict[str, List[Any]], metric: str = 'sharpe', n_jobs: int = 1, seed: int = 0) -> Dict[str, Any]:
+        """
+        Backtests every parameter combination and returns the best one.
 
-            self.logger and self.logger.log(f"[OPTIMIZER] Metric Score = {score:.5f}")
-            self.logger and self.logger.log(f"[OPTIMIZER] Trade Stats: {stats}")
+        With n_jobs > 1 the combinations run in a pool of worker processes and
+        scores are logged as they finish. Every run is seeded with `seed + idx`,
+        so the serial and parallel searches pick the same parameters.
+        """
+        self.logger and self.logger.log(f"[OPTIMIZER] Starting optimization using metric: {metric}")
+        param_sets = list(self._generate_parameter_combinations(parameter_grid))
+
+        # Patterns, S/R and observations do not depend on the parameters; compute them once
+        if self.features is None:
+            from src.backtesting.features import BacktestFeatures
+            self.features = BacktestFeatures(self.historical_data)
+
+        if n_jobs > 1:
+            scores = self._run_parallel(param_sets, metric, n_jobs, seed)
+        else:
+            scores = {}
+            for idx, params in enumerate(param_sets, 1):
+                self.logger and self.logger.log(f"\n[OPTIMIZER] --- Running Param Set {idx} ---\n{params}")
+                score, stats = self._backtest(params, metric, seed=seed + idx)
+                self._log_score(score, stats)
+                scores[idx] = score
 
-            if score > best_score:
-                best_score = score
+        best_score = -np.inf
+        best_params = {}
+        for idx, params in enumerate(param_sets, 1):
+            if scores[idx] > best_score:
+                best_score = scores[idx]
                 best_params = params
 
         self.logger and self.logger.log(f"\n[OPTIMIZER] Best Params: {best_params} | Score: {best_score:.5f}")
         return best_params
 
+    def _run_parallel(self, param_sets: List[Dict[str, Any]], metric: str, n_jobs: int, seed: int) -> Dict[int, float]:
+        # spawn keeps workers clear of any TensorFlow state already loaded in this process
+        context = multiprocessing.get_context('spawn')
+        initargs = (self.historical_data, self.symbol, self.timeframe, self.account_balance, self.features)
+        scores = {}
+
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                                 initializer=_init_worker, initargs=initargs) as executor:
+            futures = {
+                executor.submit(_run_param_set, params, metric, seed + idx): idx
+                for idx, params in enumerate(param_sets, 1)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                score, stats = future.result()
+                self.logger and self.logger.log(f"\n[OPTIMIZER] --- Finished Param Set {idx} ---\n{param_sets[idx - 1]}")
+                self._log_score(score, stats)
+                scores[idx] = score
+
+        return scores
+
+    def _log_score(self, score: float, stats: Dict[str, Any]):
+        self.logger and self.logger.log(f"[OPTIMIZER] Metric Score = {score:.5f}")
+        self.logger and self.logger.log(f"[OPTIMIZER] Trade Stats: {stats}")
+
     def _generate_parameter_combinations(self, parameter_grid: Dict[str, List[Any]]) -> Generator[Dict[str, Any], None, None]:
         from itertools import product
         keys = list(parameter_grid.keys())
@@ -37,7 +98,8 @@ class StrategyOptimizer:
         for combination in product(*values):
             yield dict(zip(keys, combination))
 
-    def _backtest(self, params: Dict[str, Any], metric: str = 'sharpe') -> Tuple[float, Dict[str, Any]]:
+    def _backtest(self, params: Dict[str, Any], metric: str = 'sharpe', seed: Optional[int] = None) -> Tuple[float, Dict[str, Any]]:
+        import tensorflow as tf
         from src.core.orb_strategy import OpeningRangeBreakout
         from src.core.risk_manager import RiskManager
         from src.core.pattern_detector import PatternDetector
@@ -46,6 +108,9 @@ class StrategyOptimizer:
         from src.reinforcement.environment import TradingEnvironment
         from src.backtesting.engine import HybridStrategyWrapper, BacktestEngine
 
+        if seed is not None:
+            tf.keras.utils.set_random_seed(seed)
+
         orb_strategy = OpeningRangeBreakout(params.get('start_time', '07:00'), params.get('end_time', '07:30'))
         risk_manager = RiskManager(risk_per_trade=params.get('risk', 0.01), account_balance=self.account_balance)
         pattern_detector = PatternDetector()
@@ -74,11 +139,15 @@ class StrategyOptimizer:
 
         strategy = HybridStrategyWrapper(
             orb_strategy, risk_manager, pattern_detector, sr_levels,
-            rl_agent=agent, env=env, historical_data=self.historical_data, symbol=self.symbol
+            rl_agent=agent, env=env, historical_data=self.historical_data, symbol=self.symbol,
+            features=self.features
         )
+        strategy.precompute_actions(seed=seed)
+        strategy.precompute_signals()
 
-        engine = BacktestEngine(strategy, self.historical_data, self.account_balance, symbol=self.symbol)
-        engine.run_backtest()
+        engine = BacktestEngine(strategy, self.historical_data, self.account_balance, risk_manager, agent, env, self.symbol,
+                                features=self.features)
+        engine.run_backtest(mode='arrays')
         results = engine.generate_report()
         score, stats = self.evaluate_strategy(results, metric)
         return score, stats
@@ -2,6 +2,7 @@ import os
 import time
 import yaml
 import pytz
+import numpy as np
 import MetaTrader5 as mt5
 from datetime import datetime
 from src.utils.secrets_manager import SecretsManager
@@ -9,11 +10,10 @@ from src.core.data_fetcher import DataFetcher
 from src.core.trader import Trader
 from src.core.risk_manager import RiskManager
 from src.core.orb_strategy import OpeningRangeBreakout
-from src.reinforcement.agent import DQNAgent
 from src.utils.logger import Logger
 from src.utils.reporter import Reporter
 from src.core.time_manager import TimeManager
-from src.core.pattern_detector import PatternDetector
+from src.core.pattern_detector import PatternDetector, StreamingPatternDetector
 from src.integration.news_filter import NewsFilter
 from src.integration.notifications import NotificationManager
 
@@ -30,8 +30,13 @@ class TradingBot:
         self.trader = Trader(self.config)
         self.risk_manager = RiskManager(self.config['risk_parameters'])
         self.time_manager = TimeManager(self.config)
-        self.orb_strategy = OpeningRangeBreakout()
+        trading_settings = self.config.get('trading_settings', {})
+        self.orb_strategy = OpeningRangeBreakout(
+            timezone=trading_settings.get('timezone'), data_timezone=trading_settings.get('data_timezone')
+        )
         self.pattern_detector = PatternDetector()
+        self.pattern_streams = {}
+        self.indicator_engines = {}
         self.news_filter = NewsFilter(self.config['symbols'])
         self.rl_agent = self.init_rl_agent()
         self.open_positions = {}
@@ -61,7 +66,16 @@ class TradingBot:
     def init_rl_agent(self):
         if not os.getenv('REINFORCEMENT_LEARNING_ENABLED', 'True') == 'True':
             return None
-            
+
+        # The bot only acts, so prefer the exported weights and keep TensorFlow out of the process
+        inference_model = self.config['rl_parameters'].get('inference_model', 'models/dqn_model.npz')
+        if os.path.exists(inference_model):
+            from src.reinforcement.inference import InferenceAgent
+            return InferenceAgent.load(inference_model)
+
+        self.logger.log(f"No exported model at {inference_model}; loading the TensorFlow agent "
+                        f"(run scripts/export_inference_model.py to avoid this)")
+        from src.reinforcement.agent import DQNAgent
         with open('config/rl_config.yaml', 'r') as file:
             rl_config = yaml.safe_load(file)
             
@@ -112,11 +126,12 @@ class TradingBot:
                     
                 # ORB Strategy
                 s_r_levels = self.data_fetcher.get_sr_levels(symbol)
-                patterns = self.pattern_detector.analyze_patterns(market_data)
+                patterns = self.get_pattern_stream(symbol).update(market_data)
                 current_row = market_data.iloc[-1].to_dict()
                 
                 if self.orb_strategy.is_setup_valid(current_row, s_r_levels, patterns):
-                    entry_signal = self.orb_strategy.get_entry_signal(current_row)
+                    or_high, or_low = self.orb_strategy.opening_range_arrays(market_data)
+                    entry_signal = self.orb_strategy.get_entry_signal(current_row, or_high[-1], or_low[-1])
                     if entry_signal:
                         lot_size = self.risk_manager.calculate_position_size(
                             symbol, 
@@ -135,17 +150,32 @@ class TradingBot:
 
                 # RL Strategy
                 if self.rl_agent:
-                    state = self.prepare_rl_state(market_data)
-                    action = self.rl_agent.act(state)
+                    state = self.prepare_rl_state(market_data, symbol)
+                    # Greedy: live orders must not follow the training exploration epsilon
+                    action = self.rl_agent.act(state, training=False)
                     self.execute_rl_action(action, symbol)
                     
             except Exception as e:
                 self.logger.log_error(f"Error processing {symbol}: {str(e)}")
 
-    def prepare_rl_state(self, data):
-        from src.utils.feature_engineering import add_technical_indicators
-        processed = add_technical_indicators(data.copy())
-        return processed.iloc[-1].values
+    def get_pattern_stream(self, symbol):
+        if symbol not in self.pattern_streams:
+            self.pattern_streams[symbol] = StreamingPatternDetector(self.pattern_detector)
+        return self.pattern_streams[symbol]
+
+    def get_indicator_engine(self, symbol, include_obv=False):
+        if symbol not in self.indicator_engines:
+            from src.utils.feature_engineering import IndicatorEngine
+            self.indicator_engines[symbol] = IndicatorEngine(include_obv=include_obv)
+        return self.indicator_engines[symbol]
+
+    def prepare_rl_state(self, data, symbol):
+        # Same vector as add_technical_indicators(data).iloc[-1], updated incrementally per closed bar
+        engine = self.get_indicator_engine(symbol, include_obv='volume' in data.columns)
+        features = engine.sync(data)
+        if np.isnan(features).any():
+            raise ValueError(f"Not enough bars to compute indicators for {symbol}")
+        return np.concatenate([data.iloc[-1].to_numpy(), features])
 
     def execute_rl_action(self, action, symbol):
         if action == 0:  # Hold
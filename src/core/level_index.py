@@ -0,0 +1,52 @@
+from bisect import bisect_left
+from typing import Iterable, Optional
+import numpy as np
+
+class LevelIndex:
+    """
+    Sorted price levels with bisect-based nearest-level queries, plus
+    vectorized queries over whole price arrays for backtests.
+    """
+    def __init__(self, levels: Iterable[float]):
+        # NaN levels can never be "near" a price, so they are dropped up front
+        self._sorted = sorted(float(level) for level in levels if level == level)
+        self._array = None
+
+    @property
+    def levels(self) -> np.ndarray:
+        if self._array is None:
+            self._array = np.asarray(self._sorted, dtype=np.float64)
+        return self._array
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def nearest_index(self, price: float) -> Optional[int]:
+        if not self._sorted:
+            return None
+        i = bisect_left(self._sorted, price)
+        if i == len(self._sorted) or (i > 0 and price - self._sorted[i - 1] <= self._sorted[i] - price):
+            i -= 1
+        return i
+
+    def nearest(self, price: float) -> Optional[float]:
+        i = self.nearest_index(price)
+        return None if i is None else self._sorted[i]
+
+    def is_near(self, price: float, threshold: float) -> bool:
+        level = self.nearest(price)
+        return level is not None and abs(price - level) < threshold
+
+    def distances(self, prices) -> np.ndarray:
+        """Distance from every price to its nearest level (inf when there are no levels)."""
+        prices = np.asarray(prices, dtype=np.float64)
+        if not self._sorted:
+            return np.full(prices.shape, np.inf)
+        levels = self.levels
+        right = np.clip(np.searchsorted(levels, prices), 0, len(levels) - 1)
+        left = np.clip(right - 1, 0, len(levels) - 1)
+        return np.minimum(np.abs(prices - levels[left]), np.abs(prices - levels[right]))
+
+    def near_mask(self, prices, threshold) -> np.ndarray:
+        """Boolean mask of the prices strictly closer than `threshold` (scalar or per price) to a level."""
+        return self.distances(prices) < threshold
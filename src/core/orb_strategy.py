@@ -1,89 +1,118 @@
+import numpy as np
 import pandas as pd
 from datetime import time
+from zoneinfo import ZoneInfo
+from src.core.level_index import LevelIndex
+from src.core.pattern_detector import Pattern, patterns_to_mask, mask_to_patterns
+from src.utils.helpers import column_array
 from src.utils.logger import Logger
 
+# "Harami" is kept from the original rule set; the detector only emits the bullish/bearish variants
+REQUIRED_PATTERNS = patterns_to_mask({
+    "Bullish Engulfing", "Bearish Engulfing",
+    "Morning Star", "Evening Star",
+    "Hammer", "Hanging Man",
+    "Doji", "Inverted Hammer",
+    "Shooting Star", "Piercing Line",
+    "Dark Cloud Cover", "Three White Soldiers",
+    "Three Black Crows", "Harami", "Marubozu"
+})
+
+REVERSAL_PATTERNS = {
+    "long": patterns_to_mask({"Shooting Star", "Bearish Engulfing", "Evening Star", "Hanging Man", "Dark Cloud Cover"}),
+    "short": patterns_to_mask({"Hammer", "Bullish Engulfing", "Morning Star", "Inverted Hammer", "Piercing Line"}),
+}
+
+# Plain ints: IntFlag operators are slow on the per-bar path
+CHART_REVERSALS = {"long": int(Pattern.DOUBLE_TOP), "short": int(Pattern.DOUBLE_BOTTOM)}
+
+# Exit reason codes returned by `exit_reasons`, in the order the rules are checked; 0 means no exit
+EXIT_REASONS = (
+    None,
+    "Price reached resistance",
+    "Price reached support",
+    "Reversal candlestick pattern",
+    "Double Top reversal",
+    "Double Bottom reversal",
+    "Price breached ORB low in long trade",
+    "Price breached ORB high in short trade",
+    "Time-based exit",
+    "Hit stop loss (long)",
+    "Hit stop loss (short)",
+    "Hit take profit (long)",
+    "Hit take profit (short)",
+)
+
+EXIT_HOLD_MINUTES = 60 * 24  # 1 day
+TAKE_PROFIT_DISTANCE = 100 * 0.0001
+SR_PROXIMITY = 0.001  # share of the price within which a close counts as near a level
+
 class OpeningRangeBreakout:
-    def __init__(self, start_time="07:00", end_time="07:30", logger=None):
+    def __init__(self, start_time="07:00", end_time="07:30", logger=None, timezone=None, data_timezone=None):
+        # Session times are read in `timezone`; naive bar times are in `data_timezone`
+        # (MT5 returns broker server time) and are left unconverted when it is unset
         self.start_time = pd.to_datetime(start_time).time()
         self.end_time = pd.to_datetime(end_time).time()
+        self.timezone = timezone
+        self.data_timezone = data_timezone
+        self._tzinfo = _tzinfo(timezone)
+        self._data_tzinfo = _tzinfo(data_timezone)
         self.or_high = None
         self.or_low = None
         self.logger = Logger('backtest_reports/trading_bot.log')
 
     def is_setup_valid(self, row, s_r_levels, patterns):
-        row_time = row['Time'].time()
-        # self.logger.log(f"[ORB] Checking setup validity for time: {row_time}")
-
-        # Time check
-        if not (self.start_time <= row_time <= self.end_time):
-            # self.logger.log(f"[ORB] Time {row_time} outside of entry window: {self.start_time} - {self.end_time}")
+        # Per-bar form of `setup_mask`, kept scalar for the live bot and row-wise backtests
+        # s_r_levels may be a LevelIndex or a dict of levels; patterns a Pattern bitmask or a list of names
+        time_of_day = self._time_of_day(row['Time'])
+        if time_of_day is None or not (self.start_time <= time_of_day <= self.end_time):
             return False
 
-        # Support/resistance proximity check
-        price = row['Close']
-        sr_threshold = 0.001 * price
-        near_support = any(abs(price - level) < sr_threshold for level in s_r_levels.values())
-        # self.logger.log(f"[ORB] Price: {price} | SR threshold: {sr_threshold} | Near support: {near_support}")
-        if not near_support:
-            # self.logger.log("[ORB] Price not near any SR level, setup invalid.")
+        price = float(row['Close'])
+        sr_threshold = SR_PROXIMITY * price
+        if isinstance(s_r_levels, LevelIndex):
+            near_level = s_r_levels.is_near(price, sr_threshold)
+        else:
+            near_level = any(abs(price - level) < sr_threshold for level in s_r_levels.values())
+        if not near_level:
             return False
 
-        # Candlestick pattern check
-        required_patterns = {
-            "Bullish Engulfing", "Bearish Engulfing",
-            "Morning Star", "Evening Star",
-            "Hammer", "Hanging Man",
-            "Doji", "Inverted Hammer",
-            "Shooting Star", "Piercing Line",
-            "Dark Cloud Cover", "Three White Soldiers",
-            "Three Black Crows", "Harami", "Marubozu"
-        }
+        return (patterns_to_mask(patterns) & REQUIRED_PATTERNS) != 0
 
-        matched_patterns = [p for p in patterns if p in required_patterns]
-        # self.logger.log(f"[ORB] Patterns detected: {patterns}")
-        # self.logger.log(f"[ORB] Matched patterns: {matched_patterns}")
+    def get_entry_signal(self, row, or_high=None, or_low=None):
+        """
+        Breakout signal for `row`. Pass the session's range (e.g. from
+        `opening_range_arrays`) as or_high/or_low; without it the range is
+        taken from the first row ever seen.
+        """
+        price = row['Close']
+        symbol = row.get('symbol', 'symbol')  # Assumes symbol is included in row
 
-        if not matched_patterns:
-            # self.logger.log("[ORB] No required pattern matched, setup invalid.")
-            return False
+        if or_high is None or or_low is None:
+            # Set OR high/low if not already set
+            if self.or_high is None or self.or_low is None:
+                self.or_high = row['High']
+                self.or_low = row['Low']
+                # self.logger.log(f"[ORB] Initial OR range set: High={self.or_high}, Low={self.or_low}")
+            or_high, or_low = self.or_high, self.or_low
 
-        # self.logger.log("[ORB] Setup is valid.")
-        return True
+        # Same rule as `entry_signals`
+        if price > or_high:
+            direction, stop_loss, take_profit = 'buy', or_low, price + TAKE_PROFIT_DISTANCE
+        elif price < or_low:
+            direction, stop_loss, take_profit = 'sell', or_high, price - TAKE_PROFIT_DISTANCE
+        else:
+            # self.logger.log("[ORB] No breakout occurred, no signal generated.")
+            return None
 
-    def get_entry_signal(self, row):
-        price = row['Close']
-        symbol = row.get('symbol', 'symbol')  # Assumes symbol is included in row
+        return {
+            'symbol': symbol,
+            'direction': direction,
+            'price': price,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit
+        }
 
-        # Set OR high/low if not already set
-        if self.or_high is None or self.or_low is None:
-            self.or_high = row['High']
-            self.or_low = row['Low']
-            # self.logger.log(f"[ORB] Initial OR range set: High={self.or_high}, Low={self.or_low}")
-
-        # self.logger.log(f"[ORB] Checking entry signal at price: {price}")
-
-        if price > self.or_high:
-            # self.logger.log(f"[ORB] Price {price} > OR High {self.or_high}. Signal: BUY")
-            return {
-                'symbol': symbol,
-                'direction': 'buy',
-                'price': price,
-                'stop_loss': self.or_low,
-                'take_profit': price + (100 * 0.0001)
-            }
-        elif price < self.or_low:
-            # self.logger.log(f"[ORB] Price {price} < OR Low {self.or_low}. Signal: SELL")
-            return {
-                'symbol': symbol,
-                'direction': 'sell',
-                'price': price,
-                'stop_loss': self.or_high,
-                'take_profit': price - (100 * 0.0001)
-            }
-
-        # self.logger.log("[ORB] No breakout occurred, no signal generated.")
-        return None
-    
     def get_exit_signal(self, row, s_r_levels, patterns):
         """
         Determines whether an exit signal should be triggered based on:
@@ -95,118 +124,233 @@ class OpeningRangeBreakout:
         """
         time = row['Time']
         close = row['Close']
-        high = row['High']
-        low = row['Low']
 
         if not hasattr(self, 'current_trade') or self.current_trade not in {"long", "short"}:
             return None
 
-        # === 1. S/R Level Check ===
-        if self.current_trade == "long" and close >= s_r_levels.get("resistance", float('inf')):
-            return {
-                "reason": "Price reached resistance",
-                "exit_price": close,
-                "time": time
-            }
-
-        if self.current_trade == "short" and close <= s_r_levels.get("support", float('-inf')):
-            return {
-                "reason": "Price reached support",
-                "exit_price": close,
-                "time": time
-            }
-
-        # === 2. Reversal Candlestick Pattern Check ===
-        reversal_patterns = {
-            "long": {"Shooting Star", "Bearish Engulfing", "Evening Star", "Hanging Man", "Dark Cloud Cover"},
-            "short": {"Hammer", "Bullish Engulfing", "Morning Star", "Inverted Hammer", "Piercing Line"},
+        pattern_mask = patterns_to_mask(patterns)
+        entry_time = getattr(self, "entry_time", None)
+        entry_price = _float(getattr(self, "entry_price", None), np.nan)
+        rules = _exit_rules(
+            self.current_trade == "long", self.current_trade == "short", float(close),
+            _float(s_r_levels.get("support"), -np.inf), _float(s_r_levels.get("resistance"), np.inf), pattern_mask,
+            entry_time is not None and (time - entry_time).total_seconds() / 60 > EXIT_HOLD_MINUTES,
+            entry_price == entry_price,
+            _float(getattr(self, "stop_loss_price", None), np.nan), _float(getattr(self, "take_profit_price", None), np.nan),
+            _float(getattr(self, "orb_high", None), np.nan), _float(getattr(self, "orb_low", None), np.nan)
+        )
+        reason = next((code for code, hit in enumerate(rules, 1) if hit), 0)
+        if reason == 0:
+            return None
+
+        signal = {"reason": EXIT_REASONS[reason], "exit_price": close}
+        if EXIT_REASONS[reason] == "Reversal candlestick pattern":
+            signal["pattern_match"] = mask_to_patterns(pattern_mask & REVERSAL_PATTERNS[self.current_trade])
+        signal["time"] = time
+        return signal
+
+    def generate_signals(self, times, highs, lows, closes, support, resistance, pattern_mask,
+                         levels=None, or_high=None, or_low=None, position=None, **trade_state):
+        """
+        Batch form of the per-row API over aligned arrays for a full history.
+
+        Returns a dict of bar-aligned arrays: setup_valid, direction (1 buy,
+        -1 sell, 0 none), stop_loss and take_profit of the entry (NaN without
+        one) and exit_reason (codes into EXIT_REASONS). Proximity uses `levels`
+        when given, else the support/resistance columns; the opening range is
+        computed per session unless passed in. Exit reasons need the open
+        `position` per bar plus the trade state arrays accepted by `exit_reasons`.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if levels is None:
+            levels = np.column_stack([support, resistance])
+        if or_high is None or or_low is None:
+            or_high, or_low = self.opening_range_arrays({'Time': times, 'High': highs, 'Low': lows})
+
+        setup = self.setup_mask(times, closes, levels, pattern_mask)
+        direction, stop_loss, take_profit = self.entry_signals(closes, or_high, or_low, setup)
+        if position is None:
+            exit_reason = np.zeros(len(closes), dtype=np.int8)
+        else:
+            exit_reason = self.exit_reasons(times, closes, support, resistance, pattern_mask, position, **trade_state)
+
+        return {
+            'setup_valid': setup,
+            'direction': direction,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'exit_reason': exit_reason
         }
 
-        matched_reversals = [p for p in patterns if p in reversal_patterns.get(self.current_trade, set())]
-        if matched_reversals:
-            return {
-                "reason": "Reversal candlestick pattern",
-                "exit_price": close,
-                "pattern_match": matched_reversals,
-                "time": time
-            }
-
-        # === 3. Chart Pattern Check ===
-        if self.current_trade == "long" and "Double Top" in patterns:
-            return {
-                "reason": "Double Top reversal",
-                "exit_price": close,
-                "time": time
-            }
-
-        if self.current_trade == "short" and "Double Bottom" in patterns:
-            return {
-                "reason": "Double Bottom reversal",
-                "exit_price": close,
-                "time": time
-            }
-
-        # === 4. ORB Breach Reversal ===
-        orb_high = getattr(self, "orb_high", None)
-        orb_low = getattr(self, "orb_low", None)
-
-        if self.current_trade == "long" and orb_low is not None and close < orb_low:
-            return {
-                "reason": "Price breached ORB low in long trade",
-                "exit_price": close,
-                "time": time
-            }
-
-        if self.current_trade == "short" and orb_high is not None and close > orb_high:
-            return {
-                "reason": "Price breached ORB high in short trade",
-                "exit_price": close,
-                "time": time
-            }
-
-        # === 5. Time-Based Exit ===
-        if hasattr(self, "entry_time"):
-            exit_hold_minutes = 60 * 24  # 1 day
-            elapsed_minutes = (time - self.entry_time).total_seconds() / 60
-            if elapsed_minutes > exit_hold_minutes:
-                return {
-                    "reason": "Time-based exit",
-                    "exit_price": close,
-                    "time": time
-                }
-
-        # === 6. Stop Loss and Take Profit Logic ===
-        entry_price = getattr(self, "entry_price", None)
-        stop_loss_price = getattr(self, "stop_loss_price", None)
-        take_profit_price = getattr(self, "take_profit_price", None)
-
-        if entry_price is not None and stop_loss_price is not None:
-            if self.current_trade == "long" and close <= stop_loss_price:
-                return {
-                    "reason": "Hit stop loss (long)",
-                    "exit_price": close,
-                    "time": time
-                }
-            elif self.current_trade == "short" and close >= stop_loss_price:
-                return {
-                    "reason": "Hit stop loss (short)",
-                    "exit_price": close,
-                    "time": time
-                }
-
-        if entry_price is not None and take_profit_price is not None:
-            if self.current_trade == "long" and close >= take_profit_price:
-                return {
-                    "reason": "Hit take profit (long)",
-                    "exit_price": close,
-                    "time": time
-                }
-            elif self.current_trade == "short" and close <= take_profit_price:
-                return {
-                    "reason": "Hit take profit (short)",
-                    "exit_price": close,
-                    "time": time
-                }
-
-        return None
+    def setup_mask(self, times, closes, levels, pattern_mask):
+        """
+        Vectorized `is_setup_valid`: bar inside the entry window, close near a
+        level and at least one required pattern present.
+        """
+        _, in_window = self._session_window(times)
+        near_level = self.sr_proximity_mask(closes, levels)
+        matched_patterns = (np.asarray(pattern_mask, dtype=np.int64) & REQUIRED_PATTERNS) != 0
+        return in_window & near_level & matched_patterns
+
+    def sr_proximity_mask(self, prices, levels):
+        """
+        Vectorized proximity check of `is_setup_valid` for a whole price array.
+        `levels` is either a LevelIndex shared by all bars or an (n_bars x k)
+        array of bar-aligned levels, e.g. column-stacked support/resistance.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        sr_threshold = SR_PROXIMITY * prices
+        if isinstance(levels, LevelIndex):
+            return levels.near_mask(prices, sr_threshold)
+        levels = np.asarray(levels, dtype=np.float64).reshape(len(prices), -1)
+        with np.errstate(invalid='ignore'):
+            return np.any(np.abs(prices[:, None] - levels) < sr_threshold[:, None], axis=1)
+
+    def entry_signals(self, closes, or_high, or_low, setup=None):
+        """
+        Vectorized breakout check of `get_entry_signal`.
+        Returns (direction, stop_loss, take_profit) arrays.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        or_high = np.asarray(or_high, dtype=np.float64)
+        or_low = np.asarray(or_low, dtype=np.float64)
+
+        buy = closes > or_high
+        sell = ~buy & (closes < or_low)
+        if setup is not None:
+            buy &= setup
+            sell &= setup
+
+        direction = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+        stop_loss = np.where(buy, or_low, np.where(sell, or_high, np.nan))
+        take_profit = np.where(buy, closes + TAKE_PROFIT_DISTANCE, np.where(sell, closes - TAKE_PROFIT_DISTANCE, np.nan))
+        return direction, stop_loss, take_profit
+
+    def exit_reasons(self, times, closes, support=None, resistance=None, pattern_mask=None, position=None,
+                     entry_time=None, entry_price=None, stop_loss_price=None, take_profit_price=None,
+                     orb_high=None, orb_low=None):
+        """
+        Vectorized `get_exit_signal`: the first matching rule per bar as a code
+        into EXIT_REASONS. `position` is 1 for long, -1 for short and 0 when
+        flat; trade state arrays use NaN/NaT (or None) where a value is unset.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        n = len(closes)
+        position = np.zeros(n, dtype=np.int8) if position is None else np.asarray(position)
+        pattern_mask = np.zeros(n, dtype=np.int64) if pattern_mask is None else np.asarray(pattern_mask, dtype=np.int64)
+        support = _float_array(support, n, -np.inf)
+        resistance = _float_array(resistance, n, np.inf)
+        entry_price = _float_array(entry_price, n, np.nan)
+        stop_loss_price = _float_array(stop_loss_price, n, np.nan)
+        take_profit_price = _float_array(take_profit_price, n, np.nan)
+        orb_high = _float_array(orb_high, n, np.nan)
+        orb_low = _float_array(orb_low, n, np.nan)
+
+        if entry_time is None:
+            expired = np.zeros(n, dtype=bool)
+        else:
+            elapsed_minutes = (pd.DatetimeIndex(times) - pd.DatetimeIndex(entry_time)) / pd.Timedelta(minutes=1)
+            expired = np.asarray(elapsed_minutes > EXIT_HOLD_MINUTES)
+
+        with np.errstate(invalid='ignore'):
+            rules = _exit_rules(position == 1, position == -1, closes, support, resistance, pattern_mask, expired,
+                                ~np.isnan(entry_price), stop_loss_price, take_profit_price, orb_high, orb_low)
+        return np.select(rules, np.arange(1, len(EXIT_REASONS)), default=0).astype(np.int8)
+
+    def opening_range_table(self, data):
+        """
+        One row per trading day (in the configured timezone) with the high and
+        low of the bars inside the start_time..end_time window, from one groupby pass.
+        """
+        sessions, in_window = self._session_window(column_array(data, 'Time'))
+        frame = pd.DataFrame({
+            'session': sessions[in_window],
+            'or_high': column_array(data, 'High')[in_window],
+            'or_low': column_array(data, 'Low')[in_window]
+        })
+        return frame.groupby('session').agg(or_high=('or_high', 'max'), or_low=('or_low', 'min'))
+
+    def opening_range_arrays(self, data):
+        """
+        Bar-aligned opening range as known at each bar: the high/low of the
+        session's window bars strictly before it. Once the window has closed
+        this equals the session's `opening_range_table` row; bars before the
+        first window bar of their session get NaN.
+        """
+        sessions, in_window = self._session_window(column_array(data, 'Time'))
+        highs = pd.Series(np.where(in_window, column_array(data, 'High'), -np.inf))
+        lows = pd.Series(np.where(in_window, column_array(data, 'Low'), np.inf))
+        codes = pd.factorize(sessions)[0]
+
+        or_high = highs.groupby(codes).cummax().groupby(codes).shift(1).to_numpy()
+        or_low = lows.groupby(codes).cummin().groupby(codes).shift(1).to_numpy()
+        return np.where(np.isfinite(or_high), or_high, np.nan), np.where(np.isfinite(or_low), or_low, np.nan)
+
+    def _session_window(self, times):
+        times = pd.DatetimeIndex(times)
+        if self.timezone is not None:
+            if times.tz is None and self.data_timezone is not None:
+                # Bars in the hour repeated or skipped by a DST change of the data timezone fall outside every window
+                times = times.tz_localize(self.data_timezone, ambiguous='NaT', nonexistent='NaT')
+            if times.tz is not None:
+                times = times.tz_convert(self.timezone)
+        sessions = times.normalize()
+        # Wall-clock time of day; on DST change days it differs from the time elapsed since midnight
+        wall_times = times.tz_localize(None) if times.tz is not None else times
+        time_of_day = wall_times - wall_times.normalize()
+        start = pd.Timedelta(hours=self.start_time.hour, minutes=self.start_time.minute, seconds=self.start_time.second)
+        end = pd.Timedelta(hours=self.end_time.hour, minutes=self.end_time.minute, seconds=self.end_time.second)
+        in_window = np.asarray((time_of_day >= start) & (time_of_day <= end))
+        return sessions, in_window
+
+    def _time_of_day(self, time):
+        """
+        Time of day of one bar in the session timezone, converted like
+        `_session_window` does; None where that gives NaT (DST gaps and repeats).
+        """
+        if self.timezone is None:
+            return time.time()
+        if isinstance(time, pd.Timestamp):
+            time = time.to_pydatetime()
+        if time.tzinfo is None:
+            if self._data_tzinfo is None:
+                return time.time()
+            time = time.replace(tzinfo=self._data_tzinfo)
+            if time.utcoffset() != time.replace(fold=1).utcoffset():
+                return None
+        return time.astimezone(self._tzinfo).time()
+
+
+def _exit_rules(long, short, closes, support, resistance, pattern_mask, expired, has_entry,
+                stop_loss_price, take_profit_price, orb_high, orb_low):
+    """Exit conditions in EXIT_REASONS order, for one bar's scalars or bar-aligned arrays alike."""
+    return [
+        long & (closes >= resistance),
+        short & (closes <= support),
+        (long & ((pattern_mask & REVERSAL_PATTERNS["long"]) != 0)) |
+        (short & ((pattern_mask & REVERSAL_PATTERNS["short"]) != 0)),
+        long & ((pattern_mask & CHART_REVERSALS["long"]) != 0),
+        short & ((pattern_mask & CHART_REVERSALS["short"]) != 0),
+        long & (closes < orb_low),
+        short & (closes > orb_high),
+        (long | short) & expired,
+        long & has_entry & (closes <= stop_loss_price),
+        short & has_entry & (closes >= stop_loss_price),
+        long & has_entry & (closes >= take_profit_price),
+        short & has_entry & (closes <= take_profit_price),
+    ]
+
+
+def _tzinfo(timezone):
+    return ZoneInfo(timezone) if isinstance(timezone, str) else timezone
+
+
+def _float(value, fill):
+    return fill if value is None else float(value)
+
 
+def _float_array(values, n, fill):
+    if values is None:
+        return np.full(n, fill)
+    return np.array([fill if value is None else value for value in values] if isinstance(values, list) else values,
+                    dtype=np.float64)
@@ -1,147 +1,195 @@
+from collections import deque
+from enum import IntFlag
 from typing import List, Tuple
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.utils.helpers import column_array, column_key
 from src.utils.logger import Logger
 
+CANDLESTICK_PATTERNS = (
+    "Hammer", "Hanging Man", "Inverted Hammer", "Shooting Star", "Marubozu", "Doji",
+    "Bullish Engulfing", "Bearish Engulfing", "Piercing Line", "Dark Cloud Cover",
+    "Bullish Harami", "Bearish Harami",
+    "Morning Star", "Evening Star", "Three White Soldiers", "Three Black Crows"
+)
+
+CHART_PATTERNS = (
+    "Double Top", "Double Bottom", "Ascending Triangle", "Descending Triangle", "Bull Flag", "Bear Flag"
+)
+
+PATTERN_NAMES = CANDLESTICK_PATTERNS + CHART_PATTERNS
+
+class Pattern(IntFlag):
+    """One bit per pattern, in PATTERN_NAMES order; a bar's patterns fit in one int32."""
+    HAMMER = 1 << 0
+    HANGING_MAN = 1 << 1
+    INVERTED_HAMMER = 1 << 2
+    SHOOTING_STAR = 1 << 3
+    MARUBOZU = 1 << 4
+    DOJI = 1 << 5
+    BULLISH_ENGULFING = 1 << 6
+    BEARISH_ENGULFING = 1 << 7
+    PIERCING_LINE = 1 << 8
+    DARK_CLOUD_COVER = 1 << 9
+    BULLISH_HARAMI = 1 << 10
+    BEARISH_HARAMI = 1 << 11
+    MORNING_STAR = 1 << 12
+    EVENING_STAR = 1 << 13
+    THREE_WHITE_SOLDIERS = 1 << 14
+    THREE_BLACK_CROWS = 1 << 15
+    DOUBLE_TOP = 1 << 16
+    DOUBLE_BOTTOM = 1 << 17
+    ASCENDING_TRIANGLE = 1 << 18
+    DESCENDING_TRIANGLE = 1 << 19
+    BULL_FLAG = 1 << 20
+    BEAR_FLAG = 1 << 21
+
+PATTERN_FLAGS = {name: Pattern(1 << bit) for bit, name in enumerate(PATTERN_NAMES)}
+_CANDLESTICK_BITS = np.array([1 << bit for bit in range(len(CANDLESTICK_PATTERNS))], dtype=np.int32)
+_CHART_BITS = np.array([1 << bit for bit in range(len(CANDLESTICK_PATTERNS), len(PATTERN_NAMES))], dtype=np.int32)
+
+def patterns_to_mask(patterns) -> int:
+    """ORs pattern names into a bitmask; names the detector never emits are ignored. Masks pass through."""
+    if isinstance(patterns, (int, np.integer)):
+        return int(patterns)
+    mask = 0
+    for name in patterns:
+        mask |= PATTERN_FLAGS.get(name, 0)
+    return int(mask)
+
+def mask_to_patterns(mask: int) -> List[str]:
+    return [name for bit, name in enumerate(PATTERN_NAMES) if mask >> bit & 1]
+
 class PatternDetector:
     def __init__(self, logger=None):
         self.logger = Logger('backtest_reports/trading_bot.log')
 
-    def detect_candlestick_patterns(self, data: pd.DataFrame) -> List[str]:
-        patterns = []
-
-        if len(data) < 3:
-            # self.logger.log("Not enough data to detect candlestick patterns (need at least 3 rows).")
-            return patterns
-
-        # self.logger.log("Starting candlestick pattern detection.")
-
-        for i in range(2, len(data)):
-            row_time = data.iloc[i].get("Time", f"index {i}")
-            o0, h0, l0, c0 = data.iloc[i - 2][['Open', 'High', 'Low', 'Close']]
-            o1, h1, l1, c1 = data.iloc[i - 1][['Open', 'High', 'Low', 'Close']]
-            o2, h2, l2, c2 = data.iloc[i][['Open', 'High', 'Low', 'Close']]
-
-            body1 = abs(c1 - o1)
-            body2 = abs(c2 - o2)
-            total_range2 = h2 - l2
-
+    def candlestick_matrix(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Evaluates every candlestick rule for every bar at once.
+        Returns a (bars x CANDLESTICK_PATTERNS) boolean matrix; bar i is judged on
+        bars i-2..i, so the first two rows are always False.
+        """
+        opens, highs, lows, closes = _ohlc_arrays(data)
+        matrix = np.zeros((len(closes), len(CANDLESTICK_PATTERNS)), dtype=bool)
+        if len(closes) < 3:
+            return matrix
+
+        o0, h0, l0, c0 = opens[:-2], highs[:-2], lows[:-2], closes[:-2]
+        o1, h1, l1, c1 = opens[1:-1], highs[1:-1], lows[1:-1], closes[1:-1]
+        o2, h2, l2, c2 = opens[2:], highs[2:], lows[2:], closes[2:]
+
+        body1 = np.abs(c1 - o1)
+        body2 = np.abs(c2 - o2)
+        total_range2 = h2 - l2
+        long_shadows = total_range2 > 3 * body2
+        lower_wick = (np.minimum(o2, c2) - l2) / (total_range2 + 1e-6)
+        upper_wick = (h2 - np.maximum(o2, c2)) / (total_range2 + 1e-6)
+        bearish0, bullish0 = c0 < o0, c0 > o0
+        bearish1, bullish1 = c1 < o1, c1 > o1
+        bearish2, bullish2 = c2 < o2, c2 > o2
+        small_body1 = body1 < 0.3 * (h1 - l1)
+
+        rules = {
             # === Single Candle Patterns ===
-            if total_range2 > 3 * body2 and (min(o2, c2) - l2) / (total_range2 + 1e-6) > 0.6:
-                patterns.append("Hammer")
-
-            if total_range2 > 3 * body2 and (o2 - l2) / (total_range2 + 1e-6) > 0.6:
-                patterns.append("Hanging Man")
-
-            if total_range2 > 3 * body2 and (h2 - max(o2, c2)) / (total_range2 + 1e-6) > 0.6:
-                patterns.append("Inverted Hammer")
-
-            if total_range2 > 3 * body2 and (h2 - max(o2, c2)) / (total_range2 + 1e-6) > 0.6 and c2 < o2:
-                patterns.append("Shooting Star")
-
-            if abs(h2 - c2) < 0.001 and abs(l2 - o2) < 0.001:
-                patterns.append("Marubozu")
-
-            if body2 / (total_range2 + 1e-6) < 0.1:
-                patterns.append("Doji")
-
+            "Hammer": long_shadows & (lower_wick > 0.6),
+            "Hanging Man": long_shadows & ((o2 - l2) / (total_range2 + 1e-6) > 0.6),
+            "Inverted Hammer": long_shadows & (upper_wick > 0.6),
+            "Shooting Star": long_shadows & (upper_wick > 0.6) & bearish2,
+            "Marubozu": (np.abs(h2 - c2) < 0.001) & (np.abs(l2 - o2) < 0.001),
+            "Doji": body2 / (total_range2 + 1e-6) < 0.1,
             # === Dual Candle Patterns ===
-            if c1 < o1 and c2 > o2 and c2 > o1 and o2 < c1:
-                patterns.append("Bullish Engulfing")
-
-            if c1 > o1 and c2 < o2 and c2 < o1 and o2 > c1:
-                patterns.append("Bearish Engulfing")
-
-            if c1 < o1 and c2 > o2 and o2 < c1 and c2 > (o1 + c1) / 2:
-                patterns.append("Piercing Line")
-
-            if c1 > o1 and c2 < o2 and o2 > c1 and c2 < (o1 + c1) / 2:
-                patterns.append("Dark Cloud Cover")
-
-            if c1 < o1 and o2 < c2 and o2 > c1 and c2 < o1:
-                patterns.append("Bullish Harami")
-
-            if c1 > o1 and o2 > c2 and o2 < c1 and c2 > o1:
-                patterns.append("Bearish Harami")
-
+            "Bullish Engulfing": bearish1 & bullish2 & (c2 > o1) & (o2 < c1),
+            "Bearish Engulfing": bullish1 & bearish2 & (c2 < o1) & (o2 > c1),
+            "Piercing Line": bearish1 & bullish2 & (o2 < c1) & (c2 > (o1 + c1) / 2),
+            "Dark Cloud Cover": bullish1 & bearish2 & (o2 > c1) & (c2 < (o1 + c1) / 2),
+            "Bullish Harami": bearish1 & bullish2 & (o2 > c1) & (c2 < o1),
+            "Bearish Harami": bullish1 & bearish2 & (o2 < c1) & (c2 > o1),
             # === Triple Candle Patterns ===
-            if c0 < o0 and abs(c1 - o1) < 0.3 * (h1 - l1) and c2 > o2 and c2 > ((c0 + o0) / 2):
-                patterns.append("Morning Star")
-
-            if c0 > o0 and abs(c1 - o1) < 0.3 * (h1 - l1) and c2 < o2 and c2 < ((c0 + o0) / 2):
-                patterns.append("Evening Star")
-
-            if c0 < o0 and c1 > o1 and c2 > o2 and c2 > c1 > c0:
-                patterns.append("Three White Soldiers")
-
-            if c0 > o0 and c1 < o1 and c2 < o2 and c2 < c1 < c0:
-                patterns.append("Three Black Crows")
-
-            # if patterns:
-                # self.logger.log(f"[{row_time}] Detected candlestick patterns: {patterns}")
-
-        # if not patterns:
-            # self.logger.log("No candlestick patterns detected.")
-        return patterns
+            "Morning Star": bearish0 & small_body1 & bullish2 & (c2 > (c0 + o0) / 2),
+            "Evening Star": bullish0 & small_body1 & bearish2 & (c2 < (c0 + o0) / 2),
+            "Three White Soldiers": bearish0 & bullish1 & bullish2 & (c2 > c1) & (c1 > c0),
+            "Three Black Crows": bullish0 & bearish1 & bearish2 & (c2 < c1) & (c1 < c0),
+        }
+
+        for col, name in enumerate(CANDLESTICK_PATTERNS):
+            matrix[2:, col] = rules[name]
+        return matrix
+
+    def pattern_mask(self, data: pd.DataFrame, chart_window: int = None) -> np.ndarray:
+        """
+        Per-bar Pattern bitmask (int32) of the candlestick rules, plus the rolling
+        chart patterns when `chart_window` is given.
+        """
+        mask = self.candlestick_matrix(data).astype(np.int32) @ _CANDLESTICK_BITS
+        if chart_window is not None:
+            mask |= self.chart_pattern_matrix(data, chart_window).astype(np.int32) @ _CHART_BITS
+        return mask.astype(np.int32)
 
+    def detect_candlestick_patterns(self, data: pd.DataFrame) -> List[str]:
+        # Flattened view of the matrix in bar order, then rule order
+        bars, cols = np.nonzero(self.candlestick_matrix(data))
+        return [CANDLESTICK_PATTERNS[col] for col in cols]
+
+    def chart_pattern_matrix(self, data: pd.DataFrame, window: int = 20) -> np.ndarray:
+        """
+        Evaluates the chart patterns on every rolling window of `window` bars in one pass.
+        Returns a (bars x CHART_PATTERNS) boolean matrix where row i describes the
+        window ending at bar i; rows before the first full window are False.
+        """
+        if window < 6:
+            raise ValueError(f"Chart pattern window must be at least 6 bars, got {window}")
+
+        _, highs, lows, closes = _ohlc_arrays(data)
+        matrix = np.zeros((len(closes), len(CHART_PATTERNS)), dtype=bool)
+        if len(closes) < window:
+            return matrix
+
+        high_windows = sliding_window_view(highs, window)
+        low_windows = sliding_window_view(lows, window)
+        close_windows = sliding_window_view(closes, window)
+
+        # Double Top / Bottom: the two highest highs (lowest lows) of the window nearly coincide
+        top_two = np.partition(high_windows, window - 2, axis=1)[:, -2:]
+        double_top = np.abs(top_two[:, 1] - top_two[:, 0]) < 0.002 * top_two[:, 1]
+        bottom_two = np.partition(low_windows, 1, axis=1)[:, :2]
+        double_bottom = np.abs(bottom_two[:, 0] - bottom_two[:, 1]) < 0.002 * bottom_two[:, 0]
+
+        # Triangles look at the last five bars; tolerances match np.allclose(atol=0.001 * level)
+        last_highs = high_windows[:, -5:]
+        last_lows = low_windows[:, -5:]
+        resistance = last_highs.max(axis=1, keepdims=True)
+        support = last_lows.min(axis=1, keepdims=True)
+        flat_top = np.all(np.abs(last_highs - resistance) <= 0.001 * resistance + 1e-05 * np.abs(resistance), axis=1)
+        flat_bottom = np.all(np.abs(last_lows - support) <= 0.001 * support + 1e-05 * np.abs(support), axis=1)
+        ascending = np.all(np.diff(last_lows, axis=1) > 0, axis=1) & flat_top
+        descending = np.all(np.diff(last_highs, axis=1) < 0, axis=1) & flat_bottom
+
+        # Flags look at closes[-6:-1] of the window
+        c6, c5, c4, c3, c2 = (close_windows[:, -k] for k in (6, 5, 4, 3, 2))
+        bull_flag = (c6 < c5) & (c5 < c4) & (c3 > c4) & (c2 > c3)
+        bear_flag = (c6 > c5) & (c5 > c4) & (c3 < c4) & (c2 < c3)
+
+        rules = {
+            "Double Top": double_top,
+            "Double Bottom": double_bottom,
+            "Ascending Triangle": ascending,
+            "Descending Triangle": descending,
+            "Bull Flag": bull_flag,
+            "Bear Flag": bear_flag,
+        }
+        for col, name in enumerate(CHART_PATTERNS):
+            matrix[window - 1:, col] = rules[name]
+        return matrix
 
     def detect_chart_patterns(self, data: pd.DataFrame) -> List[str]:
-        patterns = []
-
         if len(data) < 6:
-            # self.logger.log("Not enough data to detect chart patterns (need at least 6 rows).")
-            return patterns
-
-        # self.logger.log("Starting chart pattern detection.")
-
-        closes = data['Close'].astype(float).values
-        highs = data['High'].astype(float).values
-        lows = data['Low'].astype(float).values
-
-        # Double Top
-        if len(highs) >= 5:
-            max1 = np.argmax(highs)
-            highs_wo_max1 = np.delete(highs, max1)
-            max2 = np.argmax(highs_wo_max1)
-            if abs(highs[max1] - highs_wo_max1[max2]) < 0.002 * highs[max1]:
-                patterns.append("Double Top")
-
-        # Double Bottom
-        if len(lows) >= 5:
-            min1 = np.argmin(lows)
-            lows_wo_min1 = np.delete(lows, min1)
-            min2 = np.argmin(lows_wo_min1)
-            if abs(lows[min1] - lows_wo_min1[min2]) < 0.002 * lows[min1]:
-                patterns.append("Double Bottom")
-
-        # Ascending Triangle
-        if len(highs) >= 5:
-            resistance = np.max(highs[-5:])
-            if np.all(np.diff(lows[-5:]) > 0) and np.allclose(highs[-5:], resistance, atol=0.001 * resistance):
-                patterns.append("Ascending Triangle")
-
-        # Descending Triangle
-        if len(lows) >= 5:
-            support = np.min(lows[-5:])
-            if np.all(np.diff(highs[-5:]) < 0) and np.allclose(lows[-5:], support, atol=0.001 * support):
-                patterns.append("Descending Triangle")
-
-        # Bull Flag
-        if len(closes) >= 6:
-            if closes[-6] < closes[-5] < closes[-4] and closes[-3] > closes[-4] and closes[-2] > closes[-3]:
-                patterns.append("Bull Flag")
-
-        # Bear Flag
-        if len(closes) >= 6:
-            if closes[-6] > closes[-5] > closes[-4] and closes[-3] < closes[-4] and closes[-2] < closes[-3]:
-                patterns.append("Bear Flag")
-
-        # if patterns:
-        #     self.logger.log(f"Detected chart patterns: {patterns}")
-        # else:
-            # self.logger.log("No chart patterns detected.")
-
-        return patterns
+            return []
+
+        # The whole frame is a single window: the last row of the rolling matrix
+        flags = self.chart_pattern_matrix(data, window=len(data))[-1]
+        return [name for name, hit in zip(CHART_PATTERNS, flags) if hit]
 
     def analyze_patterns(self, data: pd.DataFrame) -> List[str]:
         # self.logger.log("Analyzing full pattern set.")
@@ -160,3 +208,71 @@ class PatternDetector:
         if context.get("pattern_strength", 1.0) < 0.7:
             return False
         return True
+
+
+
+class StreamingPatternDetector:
+    """
+    Per-symbol pattern state for the live loop. Keeps the last `history` closed
+    bars and evaluates patterns only when a new bar closes; between closes the
+    cached result is returned. Each new bar costs one three-bar candlestick check.
+    """
+    def __init__(self, pattern_detector: PatternDetector = None, history: int = 100):
+        self.pattern_detector = pattern_detector or PatternDetector()
+        self.history = history
+        self.times = deque(maxlen=history)
+        self.bars = {col: deque(maxlen=history) for col in ('Open', 'High', 'Low', 'Close')}
+        self.bar_masks = deque(maxlen=history)
+        self.mask = 0
+
+    @property
+    def patterns(self) -> List[str]:
+        return mask_to_patterns(self.mask)
+
+    def update(self, market_data: pd.DataFrame) -> int:
+        """
+        Feeds the latest MT5 frame; its last row is the still-forming bar and is ignored.
+        Returns the Pattern bitmask of the candlestick patterns of the stored bars and
+        the chart patterns of the stored window, like `analyze_patterns` over that window.
+        """
+        time_col = column_key(market_data, 'Time')
+        if len(market_data) < 2 or (self.times and market_data[time_col].iat[-2] <= self.times[-1]):
+            return self.mask
+
+        closed = market_data.iloc[:-1]
+        times = closed[time_col]
+        if self.times:
+            closed = closed[(times > self.times[-1]).to_numpy()]
+        if closed.empty:
+            return self.mask
+
+        # Two stored bars give the context the first new bar's triple-candle rules need
+        opens, highs, lows, closes = _ohlc_arrays(closed)
+        context = min(2, len(self.times))
+        window = {
+            col: np.concatenate([[self.bars[col][k] for k in range(-context, 0)], values])
+            for col, values in zip(self.bars, (opens, highs, lows, closes))
+        }
+        masks = self.pattern_detector.pattern_mask(window)[context:]
+
+        for i, time in enumerate(closed[time_col]):
+            self.times.append(time)
+            for col, values in zip(self.bars, (opens, highs, lows, closes)):
+                self.bars[col].append(values[i])
+            self.bar_masks.append(int(masks[i]))
+
+        mask = 0
+        for bar_mask in self.bar_masks:
+            mask |= bar_mask
+        self.mask = mask | self._chart_mask()
+        return self.mask
+
+    def _chart_mask(self) -> int:
+        if len(self.times) < 6:
+            return 0
+        window = {col: np.fromiter(values, dtype=np.float64) for col, values in self.bars.items()}
+        flags = self.pattern_detector.chart_pattern_matrix(window, window=len(self.times))[-1]
+        return int(flags.astype(np.int32) @ _CHART_BITS)
+
+def _ohlc_arrays(data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return tuple(column_array(data, name, np.float64) for name in ('Open', 'High', 'Low', 'Close'))
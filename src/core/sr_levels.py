@@ -1,17 +1,28 @@
-import MetaTrader5 as mt5
+from collections import deque
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.core.level_index import LevelIndex
 
 class SupportResistance:
-    def __init__(self, symbol, timeframe, num_levels=5, window=20):
+    def __init__(self, symbol, timeframe, num_levels=5, window=20, zone_tolerance=0.001):
         self.symbol = symbol
         self.timeframe = timeframe
         self.num_levels = num_levels
         self.sr_levels = []
         self.window = window
-        self.history = []
+        self.zone_tolerance = zone_tolerance
+        # Clustered swing zones, sorted by price for binary-search queries
+        self.zone_prices = np.empty(0)
+        self.zone_touches = np.empty(0, dtype=np.int64)
+        self.zone_index = LevelIndex([])
+        # Monotonic deques of (bar number, price) for the rolling low/high
+        self._bar_count = 0
+        self._lows = deque()
+        self._highs = deque()
 
     def fetch_historical_data(self, start_date, end_date):
+        import MetaTrader5 as mt5
         rates = mt5.copy_rates_range(self.symbol, self.timeframe, start_date, end_date)
         return pd.DataFrame(rates)
 
@@ -19,21 +30,36 @@ class SupportResistance:
         highs = historical_data['high']
         lows = historical_data['low']
         
-        # Calculate support and resistance levels
-        self.sr_levels = self.detect_levels(highs, lows)
+        # Calculate support and resistance zones and the strongest levels
+        self.zone_prices, self.zone_touches = self.detect_zones(highs, lows)
+        self.zone_index = LevelIndex(self.zone_prices)
+        self.sr_levels = self._strongest_levels(self.zone_prices, self.zone_touches)
 
     def detect_levels(self, highs, lows):
-        levels = []
-        # Identify support and resistance levels based on swing highs/lows
-        for i in range(len(highs) - 1):
-            if highs[i] > highs[i + 1] and highs[i] > highs[i - 1]:
-                levels.append(highs[i])
-            if lows[i] < lows[i + 1] and lows[i] < lows[i - 1]:
-                levels.append(lows[i])
-        
-        # Remove duplicates and sort levels
-        levels = sorted(set(levels), reverse=True)
-        return levels[:self.num_levels]
+        zone_prices, zone_touches = self.detect_zones(highs, lows)
+        return self._strongest_levels(zone_prices, zone_touches)
+
+    def detect_zones(self, highs, lows):
+        """
+        Clusters swing highs/lows into zones; returns (zone prices ascending, touch counts).
+        """
+        swing_highs, swing_lows = detect_swing_levels(highs, lows)
+        return cluster_levels(np.concatenate([swing_highs, swing_lows]), self.zone_tolerance)
+
+    def _strongest_levels(self, zone_prices, zone_touches):
+        # Most-touched zones first, reported highest price first like before
+        strongest = np.argsort(-zone_touches, kind='stable')[:self.num_levels]
+        return sorted(zone_prices[strongest].tolist(), reverse=True)
+
+    def nearest_level(self, price):
+        """
+        Returns (zone price, touches) of the zone closest to `price`, or None
+        when no zones are known. Binary search over the sorted zones.
+        """
+        i = self.zone_index.nearest_index(price)
+        if i is None:
+            return None
+        return self.zone_prices[i], int(self.zone_touches[i])
 
     def update_sr_levels(self):
         # Fetch recent historical data
@@ -45,18 +71,82 @@ class SupportResistance:
         self.calculate_sr_levels(historical_data)
 
     def get_sr_levels(self, row):
-        # Add the current row to history
-        self.history.append(row)
-        # Keep only the last 'window' rows
-        if len(self.history) > self.window:
-            self.history.pop(0)
-        # Convert to DataFrame for calculation
-        import pandas as pd
-        df = pd.DataFrame(self.history)
-        # Calculate support (lowest low) and resistance (highest high) in the window
-        support = df['Low'].min() if not df.empty else row['Low']
-        resistance = df['High'].max() if not df.empty else row['High']
-        # Optionally, add more advanced logic here
-        sr_levels = {'support': support, 'resistance': resistance}
+        """
+        Feeds one bar and returns the lowest low (support) and highest high
+        (resistance) of the last `window` bars fed, in O(1) amortized time.
+        """
+        bar = self._bar_count
+        self._bar_count += 1
+        low, high = row['Low'], row['High']
+
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((bar, low))
+        if self._lows[0][0] <= bar - self.window:
+            self._lows.popleft()
+
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((bar, high))
+        if self._highs[0][0] <= bar - self.window:
+            self._highs.popleft()
+
+        sr_levels = {'support': self._lows[0][1], 'resistance': self._highs[0][1]}
         
-        return sr_levels
\ No newline at end of file
+        return sr_levels
+
+    def get_sr_level_arrays(self, data):
+        """
+        Batch form of `get_sr_levels` for an entire series: returns the
+        support and resistance arrays seen after feeding every bar in order.
+        """
+        return rolling_support_resistance(data['Low'], data['High'], self.window)
+
+
+def detect_swing_levels(highs, lows):
+    """
+    Returns the prices of swing highs (above both neighbours) and swing lows
+    (below both neighbours). The first and last bars have one neighbour and are skipped.
+    """
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    inner_highs, inner_lows = highs[1:-1], lows[1:-1]
+    swing_highs = inner_highs[(inner_highs > highs[:-2]) & (inner_highs > highs[2:])]
+    swing_lows = inner_lows[(inner_lows < lows[:-2]) & (inner_lows < lows[2:])]
+    return swing_highs, swing_lows
+
+
+def cluster_levels(levels, tolerance=0.001):
+    """
+    Sorts `levels` and groups them into zones no wider than `tolerance` * price,
+    each anchored at its lowest level. O(n log n) for the sort plus one binary
+    search per zone. Returns (zone mean prices ascending, touch counts).
+    """
+    levels = np.sort(np.asarray(levels, dtype=np.float64))
+    if len(levels) == 0:
+        return levels, np.empty(0, dtype=np.int64)
+
+    starts = []
+    start = 0
+    while start < len(levels):
+        starts.append(start)
+        start = np.searchsorted(levels, levels[start] + tolerance * abs(levels[start]), side='right')
+
+    starts = np.asarray(starts)
+    touches = np.diff(np.append(starts, len(levels)))
+    prices = np.add.reduceat(levels, starts) / touches
+    return prices, touches
+
+
+def rolling_support_resistance(lows, highs, window=20):
+    """
+    Rolling min of `lows` and max of `highs` over the trailing `window` bars
+    (fewer at the start of the series), computed over strided window views.
+    """
+    lows = np.asarray(lows, dtype=np.float64)
+    highs = np.asarray(highs, dtype=np.float64)
+    padded_lows = np.concatenate([np.full(window - 1, np.inf), lows])
+    padded_highs = np.concatenate([np.full(window - 1, -np.inf), highs])
+    support = sliding_window_view(padded_lows, window).min(axis=1)
+    resistance = sliding_window_view(padded_highs, window).max(axis=1)
+    return support, resistance
@@ -9,6 +9,7 @@ import argparse
 from datetime import datetime
 
 from src.backtesting.engine import BacktestEngine, fetch_mt5_data, HybridStrategyWrapper
+from src.backtesting.features import BacktestFeatures
 from src.core.bot import TradingBot
 from src.core.orb_strategy import OpeningRangeBreakout
 from src.core.risk_manager import RiskManager
@@ -57,7 +58,7 @@ orb_strategy = OpeningRangeBreakout('07:30', '08:00')
 risk_manager = RiskManager(risk_per_trade=0.1, account_balance=account_balance)
 pattern_detector = PatternDetector()
 
-def run_backtest(episodes, symbol = 'XAUUSDm'):
+def run_backtest(episodes, symbol = 'XAUUSDm', jobs=1):
     start_date = datetime(2024, 1, 1)
     end_date = datetime(2024, 12, 31)
 
@@ -69,6 +70,7 @@ def run_backtest(episodes, symbol = 'XAUUSDm'):
     logger.log(f'Retrieved {len(historical_data)} historical data points.')
 
     env = TradingEnvironment(historical_data, initial_balance=account_balance)
+    features = BacktestFeatures(historical_data, pattern_detector, window_size=env.window_size)
 
     agent = DQNAgent(state_size=env.observation_space.shape[0], action_size=env.action_space.n, config=rl_config)
 
@@ -77,12 +79,14 @@ def run_backtest(episodes, symbol = 'XAUUSDm'):
 
     strategy = HybridStrategyWrapper(
         orb_strategy, risk_manager, pattern_detector, sr_levels,
-        rl_agent=agent, env=env, historical_data=historical_data, symbol=symbol
+        rl_agent=agent, env=env, historical_data=historical_data, symbol=symbol, features=features
     )
+    strategy.precompute_actions(seed=42)
+    strategy.precompute_signals()
 
     logger.log('Running hybrid backtest...')
-    engine = BacktestEngine(strategy, historical_data, account_balance, risk_manager, agent, env, symbol)
-    engine.run_backtest()
+    engine = BacktestEngine(strategy, historical_data, account_balance, risk_manager, agent, env, symbol, features=features)
+    engine.run_backtest(mode='arrays')
     report = engine.generate_report()
     print(report)
 
@@ -95,7 +99,8 @@ def run_backtest(episodes, symbol = 'XAUUSDm'):
         symbol=symbol,
         timeframe=timeframe,
         account_balance=account_balance,
-        logger=logger
+        logger=logger,
+        features=features
     )
 
     parameter_grid = {
@@ -104,7 +109,7 @@ def run_backtest(episodes, symbol = 'XAUUSDm'):
         'risk': [0.01, 0.02]
     }
 
-    best_params = strategy_optimizer.optimize(parameter_grid, metric="sharpe")
+    best_params = strategy_optimizer.optimize(parameter_grid, metric="sharpe", n_jobs=jobs)
     logger.log(f"Best parameters: {best_params}")
 
     engine._plot_equity_curve()
@@ -122,12 +127,14 @@ def main():
                        help='Trading symbols')
     parser.add_argument('--episodes', type=int, default=100, 
                        help='Training episodes')
+    parser.add_argument('--jobs', type=int, default=1,
+                       help='Worker processes for strategy optimization')
 
     args = parser.parse_args()
 
     try:
         if args.mode == 'backtest':
-            run_backtest(args.episodes, args.symbols)
+            run_backtest(args.episodes, args.symbols, args.jobs)
         elif args.mode == 'live':
             run_live()
     except KeyboardInterrupt:
@@ -1,36 +1,259 @@
 import numpy as np
 import tensorflow as tf
 import os
+from src.reinforcement.inference import DenseNetwork
 
-class PrioritizedReplayBuffer:
+class SegmentTree:
+    """
+    Array-backed binary tree over `capacity` leaves where every node holds
+    `operation` of its children; the root summarises all leaves. Updates and
+    lookups touch one node per level, O(log n), and are vectorized over batches of leaves.
+    """
+    def __init__(self, capacity, operation, neutral):
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.operation = operation
+        self.neutral = neutral
+        self.tree = np.full(2 * self.size, neutral, dtype=np.float64)
+
+    def update(self, indices, values):
+        if np.ndim(indices) == 0:
+            self._update_one(int(indices), float(values))
+            return
+        nodes = np.asarray(indices, dtype=np.int64) + self.size
+        self.tree[nodes] = values
+        # All leaves sit at the same depth, so every parent reaches the root together
+        nodes = nodes // 2
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.operation(self.tree[2 * nodes], self.tree[2 * nodes + 1])
+            nodes //= 2
+
+    def _update_one(self, index, value):
+        # Scalar path for single pushes; fancy indexing per level would dominate
+        tree, operation = self.tree, self.operation
+        node = index + self.size
+        tree[node] = value
+        node //= 2
+        while node >= 1:
+            tree[node] = operation(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    def root(self):
+        return self.tree[1]
+
+    def clear(self):
+        self.tree.fill(self.neutral)
+
+
+class SumTree(SegmentTree):
     def __init__(self, capacity):
+        super().__init__(capacity, np.add, 0.0)
+
+    def find_prefix_sum(self, prefix_sums):
+        """
+        Leaf index at which the running sum of priorities first exceeds each
+        prefix sum. Empty subtrees are never entered, so float rounding cannot
+        land on a zero-priority leaf while the root is positive.
+        """
+        prefix_sums = np.array(prefix_sums, dtype=np.float64)
+        nodes = np.ones(len(prefix_sums), dtype=np.int64)
+        while nodes[0] < self.size:
+            left = self.tree[2 * nodes]
+            go_right = (prefix_sums >= left) & (self.tree[2 * nodes + 1] > 0)
+            prefix_sums -= np.where(go_right, left, 0.0)
+            nodes = 2 * nodes + go_right
+        return nodes - self.size
+
+
+class MinTree(SegmentTree):
+    def __init__(self, capacity):
+        super().__init__(capacity, np.minimum, np.inf)
+
+
+class ReplayStorage:
+    """
+    Ring of transitions in preallocated contiguous arrays, allocated from the
+    first state's shape. Batches come out through fancy indexing.
+
+    With `share_next_states` next states are not stored: each slot keeps the
+    index of its next state instead, filled in when the same environment
+    (`env_id`) pushes its following transition, whose state is that next state.
+    Until then the slot is pending. Terminal transitions never wait, since
+    their next state is not used.
+    """
+    def __init__(self, capacity, share_next_states=False):
+        self.capacity = capacity
+        self.share_next_states = share_next_states
+        self.position = 0
+        self.size = 0
+        self.states = None
+        self.pending_slots = {}  # env_id -> slot waiting for that environment's next state
+
+    def add(self, state, action, reward, next_state, done, env_id=0):
+        """Stores a transition. Returns its slot and the pending slot it completed (or None)."""
+        if self.states is None:
+            self._allocate(np.shape(state))
+        index = self.position
+        completed = None
+        if self.share_next_states:
+            # The overwritten slot can no longer be completed by its environment
+            if self.slot_envs[index] >= 0 and self.pending_slots.get(self.slot_envs[index]) == index:
+                del self.pending_slots[self.slot_envs[index]]
+            previous = self.pending_slots.pop(env_id, None)
+            if previous is not None:
+                self.next_index[previous] = index
+                completed = previous
+            self.next_index[index] = -1
+            self.slot_envs[index] = env_id
+            if not done:
+                self.pending_slots[env_id] = index
+        else:
+            self.next_states[index] = next_state
+
+        self.states[index] = state
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.dones[index] = done
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return index, completed
+
+    def get(self, indices):
+        """(states, actions, rewards, next_states, dones) arrays for `indices`."""
+        if self.share_next_states:
+            # Terminal slots have no next index; their next state is masked out of the target
+            next_states = self.states[np.maximum(self.next_index[indices], 0)]
+        else:
+            next_states = self.next_states[indices]
+        return self.states[indices], self.actions[indices], self.rewards[indices], next_states, self.dones[indices]
+
+    def clear(self):
+        self.position = 0
+        self.size = 0
+        self.pending_slots.clear()
+        if self.states is not None and self.share_next_states:
+            self.next_index.fill(-1)
+            self.slot_envs.fill(-1)
+
+    def _allocate(self, state_shape):
+        self.states = np.zeros((self.capacity,) + state_shape, dtype=np.float32)
+        if self.share_next_states:
+            self.next_states = None
+            self.next_index = np.full(self.capacity, -1, dtype=np.int32)
+            self.slot_envs = np.full(self.capacity, -1, dtype=np.int64)
+        else:
+            self.next_states = np.zeros_like(self.states)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=bool)
+
+    def __getitem__(self, index):
+        return tuple(values[0] for values in self.get(np.array([index])))
+
+    def __len__(self):
+        return self.size
+
+
+class PrioritizedReplayBuffer:
+    """
+    Proportional prioritized replay over a ReplayStorage ring. A sum tree
+    gives O(log n) sampling by priority and a min tree the smallest priority
+    for normalising the importance-sampling weights. New experiences get the
+    highest priority seen so they are replayed at least once; call
+    `update_priorities` with the TD errors of a sampled batch.
+
+    With `share_next_states` a transition only becomes sampleable once its
+    environment has pushed the next one; `len` counts sampleable transitions.
+    """
+    def __init__(self, capacity, alpha=0.6, beta=0.4, beta_increment=0.001, epsilon=1e-6, share_next_states=False):
         self.capacity = capacity
-        self.buffer = []
-        self.priorities = []
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.buffer = ReplayStorage(capacity, share_next_states)
+        self.max_priority = 1.0
+        self.sum_tree = SumTree(capacity)
+        self.min_tree = MinTree(capacity)
+        self.pending_priorities = np.full(capacity, np.nan)
+        self.sampleable = np.zeros(capacity, dtype=bool)
+        self.sampleable_count = 0
+
+    def push(self, experience, priority=None, env_id=0):
+        index, completed = self.buffer.add(*experience, env_id=env_id)
+        priority = self.max_priority if priority is None else priority
 
-    def push(self, experience, priority=1.0):
-        if len(self.buffer) < self.capacity:
-            self.buffer.append(experience)
-            self.priorities.append(priority)
+        if not self.buffer.share_next_states or experience[4]:
+            self._activate(index, priority)
         else:
-            idx = np.argmin(self.priorities)
-            self.buffer[idx] = experience
-            self.priorities[idx] = priority
+            self._deactivate(index)
+            self.pending_priorities[index] = priority
+
+        if completed is not None:
+            self._activate(completed, self.pending_priorities[completed])
 
     def sample(self, batch_size):
-        probs = np.array(self.priorities) / np.sum(self.priorities)
-        indices = np.random.choice(len(self.buffer), batch_size, p=probs)
-        samples = [self.buffer[i] for i in indices]
-        return samples
+        """
+        Draws one experience from each of `batch_size` equal slices of the total
+        priority. Returns ((states, actions, rewards, next_states, dones),
+        indices, importance-sampling weights).
+        """
+        if self.sampleable_count == 0:
+            raise ValueError("No sampleable transitions in the replay buffer")
+        total = self.sum_tree.root()
+        prefix_sums = (np.arange(batch_size) + np.random.rand(batch_size)) * (total / batch_size)
+        indices = self.sum_tree.find_prefix_sum(prefix_sums)
+
+        # w_i = (N * P(i))^-beta, normalised by the largest weight, that of the smallest priority
+        priorities = self.sum_tree.tree[indices + self.sum_tree.size]
+        weights = (priorities / self.min_tree.root()) ** -self.beta
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return self.buffer.get(indices), indices, weights.astype(np.float32)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self._set_priorities(indices, priorities)
+
+    def clear(self):
+        self.buffer.clear()
+        self.max_priority = 1.0
+        self.sum_tree.clear()
+        self.min_tree.clear()
+        self.pending_priorities.fill(np.nan)
+        self.sampleable.fill(False)
+        self.sampleable_count = 0
+
+    def _activate(self, index, priority):
+        self._set_priorities(index, priority)
+        self.pending_priorities[index] = np.nan
+        if not self.sampleable[index]:
+            self.sampleable[index] = True
+            self.sampleable_count += 1
+
+    def _deactivate(self, index):
+        self.sum_tree.update(index, 0.0)
+        self.min_tree.update(index, np.inf)
+        if self.sampleable[index]:
+            self.sampleable[index] = False
+            self.sampleable_count -= 1
+
+    def _set_priorities(self, indices, priorities):
+        scaled = np.power(priorities, self.alpha, dtype=np.float64)
+        self.sum_tree.update(indices, scaled)
+        self.min_tree.update(indices, scaled)
 
     def __len__(self):
-        return len(self.buffer)
+        return self.sampleable_count
+
 
 class DQNAgent:
     def __init__(self, state_size, action_size, config, model_path="models/dqn_model.keras"):
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = PrioritizedReplayBuffer(config['memory_size'])
+        self.memory = PrioritizedReplayBuffer(config['memory_size'], share_next_states=config.get('replay_share_next_states', False))
         self.gamma = config['discount_factor']
         self.epsilon = config['exploration_strategy']['initial_epsilon']
         self.epsilon_min = config['exploration_strategy']['final_epsilon']
@@ -43,6 +266,8 @@ class DQNAgent:
         self.target_model = self._build_model(config)
         self.target_model.set_weights(self.model.get_weights())
         self.step_count = 0
+        self._train_step = None
+        self._q_network = None
 
         if os.path.exists(self.model_path):
             try:
@@ -67,38 +292,62 @@ class DQNAgent:
     def select_action(self, state, training=True):
         if training and np.random.rand() < self.epsilon:
             return np.random.randint(self.action_size)
-        q_values = self.model.predict(state.reshape(1, -1), verbose=0)
+        q_values = self.q_network(state)
         return np.argmax(q_values[0])
 
-    def remember(self, s, a, r, s_, done):
-        td_error = abs(r)  # Can be improved by computing actual TD error
-        self.memory.push((s, a, r, s_, done), td_error)
+    # The live bot and the training script call the agent through `act`
+    act = select_action
 
-    def replay(self):
-        if len(self.memory) < self.batch_size:
-            return
+    def q_network(self, states=None):
+        """
+        NumPy copy of the online network for single states and small batches,
+        re-extracted after the weights change. Called with states it returns their Q-values.
+        """
+        if self._q_network is None:
+            self._q_network = DenseNetwork.from_keras(self.model)
+        return self._q_network if states is None else self._q_network(states)
 
-        minibatch = self.memory.sample(self.batch_size)
-        states = []
-        targets = []
+    def select_actions(self, states, training=True):
+        """
+        Epsilon-greedy actions for a batch of states (one per environment)
+        from a single forward pass.
+        """
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_size)
+        actions = np.argmax(self.q_network(states), axis=1)
+        if training:
+            explore = np.random.rand(len(states)) < self.epsilon
+            actions[explore] = np.random.randint(self.action_size, size=explore.sum())
+        return actions
 
-        for state, action, reward, next_state, done in minibatch:
-            target = reward
-            if not done:
-                next_q = self.target_model.predict(next_state.reshape(1, -1), verbose=0)[0]
-                target = reward + self.gamma * np.max(next_q)
+    def predict_q_values(self, states, chunk_size=4096):
+        """
+        Runs one batched forward pass over `states`, chunked to cap memory.
+        """
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_size)
+        if len(states) == 0:
+            return np.empty((0, self.action_size), dtype=np.float32)
+        chunks = [
+            self.model.predict(states[start:start + chunk_size], batch_size=chunk_size, verbose=0)
+            for start in range(0, len(states), chunk_size)
+        ]
+        return np.concatenate(chunks, axis=0)
 
-            target_f = self.model.predict(state.reshape(1, -1), verbose=0)
-            target_f[0][action] = target
+    def remember(self, s, a, r, s_, done, env_id=0):
+        # Stored with the highest priority so far; replay sets the actual TD error.
+        # env_id tells interleaved environments apart when next states are shared
+        self.memory.push((s, a, r, s_, done), env_id=env_id)
 
-            states.append(state)
-            targets.append(target_f[0])
+    def replay(self):
+        if len(self.memory) < self.batch_size:
+            return
 
-        states = np.array(states)
-        targets = np.array(targets)
+        (states, actions, rewards, next_states, dones), indices, weights = self.memory.sample(self.batch_size)
 
-        dataset = tf.data.Dataset.from_tensor_slices((states, targets)).batch(self.batch_size)
-        self.model.fit(dataset, epochs=1, verbose=0)
+        if self._train_step is None:
+            self._train_step = self._build_train_step()
+        td_errors = self._train_step(states, actions, rewards, next_states, dones.astype(np.float32), weights)
+        self._q_network = None
+        self.memory.update_priorities(indices, td_errors.numpy())
 
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
@@ -108,6 +357,33 @@ class DQNAgent:
 
         self.step_count += 1
 
+    def _build_train_step(self):
+        """
+        Compiles one DQN update: Q-targets from the target network, the masked
+        MSE of the online network and the gradient step, in a single graph.
+        Returns the TD errors of the batch for the priority update.
+        """
+        model, target_model, optimizer = self.model, self.target_model, self.model.optimizer
+        loss_fn = tf.keras.losses.MeanSquaredError()
+        gamma, action_size = self.gamma, self.action_size
+
+        @tf.function(reduce_retracing=True)
+        def train_step(states, actions, rewards, next_states, dones, weights):
+            next_q = target_model(next_states, training=False)
+            target_values = rewards + gamma * tf.reduce_max(next_q, axis=1) * (1.0 - dones)
+            action_mask = tf.one_hot(actions, action_size)
+
+            with tf.GradientTape() as tape:
+                q_values = model(states, training=True)
+                # Only the taken action's output moves; the others are their own targets, as in fit()
+                targets = tf.stop_gradient(q_values * (1.0 - action_mask) + action_mask * target_values[:, None])
+                loss = loss_fn(targets, q_values, sample_weight=weights)
+            gradients = tape.gradient(loss, model.trainable_variables)
+            optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+            return target_values - tf.reduce_sum(tf.stop_gradient(q_values) * action_mask, axis=1)
+
+        return train_step
+
     def learn(self):
         if self.step_count % 5 == 0:
             self.replay()
@@ -117,7 +393,20 @@ class DQNAgent:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         self.model.save(path)
 
+    def export_inference(self, path=None, precision='float32'):
+        """
+        Writes the online network's weights as an .npz for InferenceAgent, which
+        serves select_action without importing TensorFlow. `precision` may be
+        float32, float16 or int8 (per-layer scaled).
+        """
+        path = path or os.path.splitext(self.model_path)[0] + '.npz'
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.q_network().save(path, precision)
+        return path
+
     def load(self, path=None):
         path = path or self.model_path
         self.model = tf.keras.models.load_model(path)
         self.target_model.set_weights(self.model.get_weights())
+        self._train_step = None
+        self._q_network = None
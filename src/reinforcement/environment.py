@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from gym import Env, spaces
 
 class TradingEnvironment(Env):
@@ -10,8 +11,16 @@ class TradingEnvironment(Env):
         self.window_size = window_size
         self.action_space = spaces.Discrete(3)  # 0 = Hold, 1 = Buy, 2 = Sell
         self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(window_size * 5 + 2,), dtype=np.float32)
+        # Normalized OHLCV windows of every step, computed once; steps only read a row
+        self.market_observations = market_observation_matrix(self.data, window_size)
+        self.closes = self.data['Close'].to_numpy(dtype=np.float64)
         self.reset()
 
+    @property
+    def observation_windows(self):
+        """(n_steps, window_size, 5) view of the precomputed windows; NaN before `window_size`."""
+        return self.market_observations.reshape(len(self.data), 5, self.window_size).transpose(0, 2, 1)
+
     def reset(self):
         self.balance = self.initial_balance
         self.equity = self.initial_balance
@@ -24,8 +33,7 @@ class TradingEnvironment(Env):
         return self._get_observation()
 
     def step(self, action):
-        row = self.data.iloc[self.current_step]
-        price = row['Close']
+        price = self.closes[self.current_step]
 
         reward = 0
         if action == 1 and self.position == 0:  # Buy
@@ -53,13 +61,8 @@ class TradingEnvironment(Env):
         return obs, reward, self.done, {}
 
     def _get_observation(self):
-        window = self.data.iloc[self.current_step - self.window_size:self.current_step]
-        features = []
-        for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-            features.extend(window[col].values / (window[col].iloc[0] + 1e-6))
-        obs = features + [self.balance / self.initial_balance, self.position]
-        return np.array(obs, dtype=np.float32)
-    
+        return self._observation_at(self.current_step)
+
     def _get_observation_from_row(self, row):
         """
         Constructs an observation window ending at the index of `row`.
@@ -77,11 +80,121 @@ class TradingEnvironment(Env):
         if index < self.window_size:
             raise ValueError(f"Index {index} too small for window size {self.window_size}")
 
-        window = self.data.iloc[index - self.window_size:index]
-        features = []
-        for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-            features.extend(window[col].values / (window[col].iloc[0] + 1e-6))
-        obs = features + [self.balance / self.initial_balance, self.position]
-        return np.array(obs, dtype=np.float32)
+        return self._observation_at(index)
+
+    def _observation_at(self, index):
+        obs = np.empty(self.observation_space.shape[0], dtype=np.float32)
+        obs[:-2] = self.market_observations[index]
+        obs[-2] = self.balance / self.initial_balance
+        obs[-1] = self.position
+        return obs
+
+    def get_observation_matrix(self, market_observations=None):
+        """
+        Builds the `_get_observation_from_row` observation for every bar in one pass.
+        Rows before `window_size` have no complete window and are left as NaN.
+        """
+        if market_observations is None:
+            market_observations = self.market_observations
+
+        observations = np.empty((len(market_observations), self.observation_space.shape[0]), dtype=np.float32)
+        observations[:, :-2] = market_observations
+        observations[:, -2] = self.balance / self.initial_balance
+        observations[:, -1] = self.position
+        observations[:self.window_size] = np.nan
+        return observations
+
+
+def market_observation_matrix(data: pd.DataFrame, window_size: int) -> np.ndarray:
+    """
+    Returns the normalized OHLCV part of every bar's observation as an
+    (n_bars, window_size * 5) float32 matrix; rows before `window_size` are NaN.
+    Each row holds the window column by column (Open..Volume), i.e. a
+    C-contiguous (n_bars, 5, window_size) tensor.
+    """
+    values = data[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=np.float64)
+    market = np.full((len(values), window_size * 5), np.nan, dtype=np.float32)
+    if len(values) <= window_size:
+        return market
+
+    # Window k covers rows k..k+window_size-1 and feeds the observation of row k+window_size
+    windows = sliding_window_view(values[:-1], window_size, axis=0)
+    normalized = windows / (windows[:, :, :1] + 1e-6)
+    market[window_size:] = normalized.reshape(len(normalized), -1)
+    return market
+
+
+class VectorizedTradingEnvironment:
+    """
+    N independent TradingEnvironment episodes stepped together. Balance,
+    position and step counters are arrays, so one call to `step` advances
+    every episode with a batched action array and returns stacked observations.
+    Episodes can run over the same DataFrame or one DataFrame each; an episode
+    that is done stays done (zero reward, unchanged observation) until `reset`.
+    """
+    def __init__(self, data, num_envs=None, initial_balance=10000, window_size=10):
+        datasets = list(data) if isinstance(data, (list, tuple)) else [data] * (num_envs or 1)
+        self.num_envs = len(datasets)
+        self.initial_balance = initial_balance
+        self.window_size = window_size
+        self.action_space = spaces.Discrete(3)  # 0 = Hold, 1 = Buy, 2 = Sell
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(window_size * 5 + 2,), dtype=np.float32)
+
+        # Each distinct DataFrame is precomputed once; episodes index into the stacked rows via offsets
+        unique, env_data = {}, []
+        for frame in datasets:
+            env_data.append(unique.setdefault(id(frame), (len(unique), frame))[0])
+        frames = [frame.reset_index(drop=True) for _, frame in sorted(unique.values(), key=lambda item: item[0])]
+        lengths = np.array([len(frame) for frame in frames])
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+        self.market_observations = np.concatenate([market_observation_matrix(frame, window_size) for frame in frames])
+        self.closes = np.concatenate([frame['Close'].to_numpy(dtype=np.float64) for frame in frames])
+        self.offsets = starts[env_data]
+        self.lengths = lengths[env_data]
+        self.reset()
+
+    def reset(self):
+        n = self.num_envs
+        self.balance = np.full(n, self.initial_balance, dtype=np.float64)
+        self.position = np.zeros(n, dtype=np.int8)  # 1 if long, -1 if short, 0 if flat
+        self.position_price = np.zeros(n, dtype=np.float64)
+        self.current_step = np.full(n, self.window_size, dtype=np.int64)
+        self.done = self.current_step >= self.lengths - 1
+        self.total_profit = np.zeros(n, dtype=np.float64)
+        return self._get_observations()
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        active = ~self.done
+        price = self.closes[self.offsets + self.current_step]
+        flat = self.position == 0
+
+        open_long = active & (actions == 1) & flat
+        open_short = active & (actions == 2) & flat
+        close_short = active & (actions == 1) & (self.position == -1)
+        close_long = active & (actions == 2) & (self.position == 1)
+
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        rewards[close_short] = (self.position_price[close_short] - price[close_short]) / self.position_price[close_short]
+        rewards[close_long] = (price[close_long] - self.position_price[close_long]) / self.position_price[close_long]
+        closed = close_short | close_long
+        self.balance[closed] += self.balance[closed] * rewards[closed]
+        self.total_profit[closed] += rewards[closed]
+
+        self.position[open_long] = 1
+        self.position[open_short] = -1
+        self.position[closed] = 0
+        self.position_price[open_long | open_short] = price[open_long | open_short]
+
+        self.current_step[active] += 1
+        self.done |= active & (self.current_step >= self.lengths - 1)
 
+        return self._get_observations(), rewards, self.done.copy(), {}
 
+    def _get_observations(self):
+        obs = np.empty((self.num_envs, self.observation_space.shape[0]), dtype=np.float32)
+        obs[:, :-2] = self.market_observations[self.offsets + self.current_step]
+        obs[:, -2] = self.balance / self.initial_balance
+        obs[:, -1] = self.position
+        return obs
@@ -0,0 +1,163 @@
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+}
+
+
+class DenseNetwork:
+    """
+    Pure-NumPy forward pass of a stack of dense layers. Used for single states
+    and small batches, where a few float32 matmuls take microseconds while a
+    Keras predict call costs milliseconds of dispatch overhead.
+    """
+    def __init__(self, weights, biases, activations):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        unknown = set(activations) - set(ACTIVATIONS)
+        if unknown:
+            raise ValueError(f"Unsupported activations: {sorted(unknown)}")
+        self.activations = list(activations)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Extracts the Dense layers of a Sequential Keras model."""
+        weights, biases, activations = [], [], []
+        for layer in model.layers:
+            params = layer.get_weights()
+            if not params:
+                continue
+            if len(params) != 2 or params[0].ndim != 2:
+                raise ValueError(f"Layer {layer.name} is not a Dense layer with a bias")
+            weights.append(params[0])
+            biases.append(params[1])
+            activations.append(layer.get_config().get('activation', 'linear'))
+        return cls(weights, biases, activations)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads weights written by `save`; needs only NumPy. Reduced-precision
+        weights are expanded back to float32 for the matmuls, as NumPy has no
+        float16/int8 GEMM, so they save file size and load bandwidth.
+        """
+        with np.load(path) as data:
+            activations = [str(name) for name in data['activations']]
+            weights = [
+                _dequantize(data[f'W{i}'], data[f'scale{i}'] if f'scale{i}' in data else None)
+                for i in range(len(activations))
+            ]
+            biases = [data[f'b{i}'] for i in range(len(activations))]
+        return cls(weights, biases, activations)
+
+    def save(self, path, precision='float32'):
+        """
+        Writes the network as an .npz. `precision` stores the dense weights as
+        float32, float16 or int8 with one symmetric scale per layer; biases stay float32.
+        """
+        arrays = {'precision': np.array(precision)}
+        for i, (weights, biases) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'W{i}'], scale = _quantize(weights, precision)
+            if scale is not None:
+                arrays[f'scale{i}'] = scale
+            arrays[f'b{i}'] = biases
+        np.savez(path, activations=np.array(self.activations), **arrays)
+
+    def quantized(self, precision):
+        """Copy whose weights went through a `precision` round trip, e.g. to validate it before exporting."""
+        weights = [_dequantize(*_quantize(w, precision)) for w in self.weights]
+        return DenseNetwork(weights, self.biases, self.activations)
+
+    @property
+    def input_size(self):
+        return self.weights[0].shape[0]
+
+    @property
+    def output_size(self):
+        return self.weights[-1].shape[1]
+
+    def __call__(self, states):
+        """Q-values for a state or a batch of states, always as an (n, actions) array."""
+        x = np.asarray(states, dtype=np.float32).reshape(-1, self.input_size)
+        for weights, biases, activation in zip(self.weights, self.biases, self.activations):
+            x = x @ weights
+            x += biases
+            x = ACTIVATIONS[activation](x)
+        return x
+
+
+class InferenceAgent:
+    """
+    TensorFlow-free stand-in for DQNAgent in processes that only pick actions,
+    such as the live bot. Loads a network exported with
+    `DQNAgent.export_inference` or scripts/export_inference_model.py and
+    exposes the same action-selection API. Acts greedily unless an epsilon is given.
+    """
+    def __init__(self, network, epsilon=0.0):
+        self.network = network
+        self.state_size = network.input_size
+        self.action_size = network.output_size
+        self.epsilon = epsilon
+
+    @classmethod
+    def load(cls, path, epsilon=0.0):
+        return cls(DenseNetwork.load(path), epsilon)
+
+    def select_action(self, state, training=True):
+        if training and np.random.rand() < self.epsilon:
+            return np.random.randint(self.action_size)
+        q_values = self.network(state)
+        return np.argmax(q_values[0])
+
+    act = select_action
+
+    def select_actions(self, states, training=True):
+        actions = np.argmax(self.network(states), axis=1)
+        if training:
+            explore = np.random.rand(len(actions)) < self.epsilon
+            actions[explore] = np.random.randint(self.action_size, size=explore.sum())
+        return actions
+
+    def predict_q_values(self, states, chunk_size=4096):
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_size)
+        if len(states) == 0:
+            return np.empty((0, self.action_size), dtype=np.float32)
+        return np.concatenate([
+            self.network(states[start:start + chunk_size]) for start in range(0, len(states), chunk_size)
+        ])
+
+
+def action_agreement(reference, candidate, states, chunk_size=4096):
+    """
+    Compares the greedy actions of two networks over `states`. Returns the
+    share of states with the same action and the largest absolute Q-value gap.
+    """
+    states = np.asarray(states, dtype=np.float32)
+    agreed, max_error = 0, 0.0
+    for start in range(0, len(states), chunk_size):
+        reference_q = reference(states[start:start + chunk_size])
+        candidate_q = candidate(states[start:start + chunk_size])
+        agreed += int(np.sum(reference_q.argmax(axis=1) == candidate_q.argmax(axis=1)))
+        max_error = max(max_error, float(np.abs(reference_q - candidate_q).max()))
+    return agreed / max(len(states), 1), max_error
+
+
+def _quantize(weights, precision):
+    if precision == 'float32':
+        return np.asarray(weights, dtype=np.float32), None
+    if precision == 'float16':
+        return np.asarray(weights, dtype=np.float16), None
+    if precision == 'int8':
+        scale = np.float32(np.abs(weights).max() / 127 or 1.0)
+        return np.clip(np.round(weights / scale), -127, 127).astype(np.int8), scale
+    raise ValueError(f"Unsupported precision {precision!r}, expected one of {PRECISIONS}")
+
+
+def _dequantize(weights, scale=None):
+    weights = np.asarray(weights, dtype=np.float32)
+    return weights if scale is None else weights * np.float32(scale)
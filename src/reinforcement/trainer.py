@@ -1,5 +1,5 @@
 from src.reinforcement.agent import DQNAgent as RLAgent
-from src.reinforcement.environment import TradingEnvironment
+from src.reinforcement.environment import TradingEnvironment, VectorizedTradingEnvironment
 from src.utils.logger import Logger
 import numpy as np
 
@@ -33,6 +33,36 @@ class Trainer:
                 self.logger.log(f"✅ New best reward: {total_reward:.2f} - saving model.")
                 self.agent.save()
 
+    def train_vectorized(self, environment: VectorizedTradingEnvironment, episodes: int):
+        """
+        Collects experience from all episodes of `environment` at once: one
+        batched forward pass picks every action and one `learn` call follows each
+        vectorized step. An episode's reward is the total of its best environment.
+        """
+        for episode in range(episodes):
+            states = environment.reset()
+            total_rewards = np.zeros(environment.num_envs)
+
+            while not environment.done.all():
+                active = np.flatnonzero(~environment.done)
+                actions = self.agent.select_actions(states)
+                next_states, rewards, dones, info = environment.step(actions)
+                for i in active:
+                    self.agent.remember(states[i], actions[i], rewards[i], next_states[i], dones[i], env_id=i)
+                if len(self.agent.memory) >= self.agent.batch_size:
+                    self.agent.learn()
+                states = next_states
+                total_rewards += rewards
+
+            total_reward = total_rewards.max()
+            self.logger.log(f"Episode {episode + 1}/{episodes} - Total Reward: {total_reward:.2f} "
+                            f"(mean {total_rewards.mean():.2f} over {environment.num_envs} envs)")
+
+            if total_reward > self.best_reward:
+                self.best_reward = total_reward
+                self.logger.log(f"✅ New best reward: {total_reward:.2f} - saving model.")
+                self.agent.save()
+
     def evaluate(self, num_episodes: int):
         total_rewards = []
 
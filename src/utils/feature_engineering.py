@@ -1,6 +1,19 @@
 import pandas as pd
 import numpy as np
-import talib
+from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+from src.utils.helpers import column_array, column_key, has_column
+
+try:
+    import talib
+except ImportError:  # talib needs the TA-Lib C library; the NumPy fallback below matches its output
+    talib = None
+
+# Bump when add_technical_indicators changes so stored features are recomputed
+FEATURE_SET_VERSION = 1
+
+# Running totals: their level depends on the first bar computed, not just a warm-up window
+CUMULATIVE_FEATURES = ('obv',)
 
 def add_technical_indicators(df):
     # Ensure required columns
@@ -13,13 +26,342 @@ def add_technical_indicators(df):
     # Calculate indicators
     df['returns'] = df['close'].pct_change()
     df['volatility'] = df['returns'].rolling(20).std()
-    df['rsi'] = talib.RSI(df['close'], timeperiod=14)
-    df['macd'], df['macd_signal'], _ = talib.MACD(df['close'])
-    df['atr'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
-    df['sma20'] = talib.SMA(df['close'], timeperiod=20)
-    df['sma50'] = talib.SMA(df['close'], timeperiod=50)
-    
-    if 'volume' in df.columns:
-        df['obv'] = talib.OBV(df['close'], df['volume'])
-    
-    return df.dropna()
\ No newline at end of file
+    if talib is not None:
+        df['rsi'] = talib.RSI(df['close'], timeperiod=14)
+        df['macd'], df['macd_signal'], _ = talib.MACD(df['close'])
+        df['atr'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
+        df['sma20'] = talib.SMA(df['close'], timeperiod=20)
+        df['sma50'] = talib.SMA(df['close'], timeperiod=50)
+
+        if 'volume' in df.columns:
+            df['obv'] = talib.OBV(df['close'], df['volume'])
+    else:
+        volumes = df[['volume']].to_numpy(np.float64).T if 'volume' in df.columns else None
+        indicators = batch_technical_indicators(
+            df[['close']].to_numpy(np.float64).T, df[['high']].to_numpy(np.float64).T,
+            df[['low']].to_numpy(np.float64).T, volumes, use_talib=False
+        )[0]
+        names = batch_feature_names(volumes is not None)
+        for name in names[2:]:
+            df[name] = indicators[:, names.index(name)]
+
+    return df.dropna()
+
+
+def batch_feature_names(include_obv=True):
+    return IndicatorEngine.FEATURES if include_obv else IndicatorEngine.FEATURES[:-1]
+
+
+def stack_ohlcv(frames, bars=None):
+    """
+    Stacks the last `bars` rows (default: the shortest frame) of per-symbol
+    OHLCV frames into (symbols x bars) arrays for `batch_technical_indicators`.
+    """
+    bars = min(len(frame) for frame in frames) if bars is None else bars
+    stacked = {}
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        if all(has_column(frame, name) for frame in frames):
+            stacked[name] = np.stack([column_array(frame, name, np.float64)[len(frame) - bars:] for frame in frames])
+    return stacked
+
+
+def batch_technical_indicators(closes, highs, lows, volumes=None, use_talib=None):
+    """
+    Indicators of `add_technical_indicators` for many symbols at once.
+
+    Takes (symbols x bars) arrays and returns a (symbols x bars x features)
+    float64 tensor whose last axis follows `batch_feature_names(volumes is not None)`;
+    bars before an indicator's warm-up are NaN. Uses talib per symbol when it is
+    installed (or `use_talib` is True), otherwise NumPy operations across all
+    symbols with the same seeding as talib.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    highs = np.atleast_2d(np.asarray(highs, dtype=np.float64))
+    lows = np.atleast_2d(np.asarray(lows, dtype=np.float64))
+    if volumes is not None:
+        volumes = np.atleast_2d(np.asarray(volumes, dtype=np.float64))
+    use_talib = talib is not None if use_talib is None else use_talib
+
+    names = batch_feature_names(volumes is not None)
+    features = np.full(closes.shape + (len(names),), np.nan)
+    features[:, 1:, 0] = closes[:, 1:] / closes[:, :-1] - 1
+    features[:, :, 1] = _rolling_std(features[:, :, 0], 20)
+
+    if use_talib:
+        for s in range(len(closes)):
+            features[s, :, 2] = talib.RSI(closes[s], timeperiod=14)
+            features[s, :, 3], features[s, :, 4], _ = talib.MACD(closes[s])
+            features[s, :, 5] = talib.ATR(highs[s], lows[s], closes[s], timeperiod=14)
+            features[s, :, 6] = talib.SMA(closes[s], timeperiod=20)
+            features[s, :, 7] = talib.SMA(closes[s], timeperiod=50)
+            if volumes is not None:
+                features[s, :, 8] = talib.OBV(closes[s], volumes[s])
+        return features
+
+    features[:, :, 2] = _rsi(closes, 14)
+    features[:, :, 3], features[:, :, 4] = _macd(closes, 12, 26, 9)
+    features[:, :, 5] = _atr(highs, lows, closes, 14)
+    features[:, :, 6] = _sma(closes, 20)
+    features[:, :, 7] = _sma(closes, 50)
+    if volumes is not None:
+        features[:, :, 8] = _obv(closes, volumes)
+    return features
+
+
+def _sma(values, period):
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= period:
+        out[:, period - 1:] = sliding_window_view(values, period, axis=1).mean(axis=-1)
+    return out
+
+
+def _rolling_std(values, window, chunk_size=4096):
+    # Sample std like pandas' rolling std; chunked so the deviations never span the full window tensor
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < window:
+        return out
+    windows = sliding_window_view(values, window, axis=1)
+    for start in range(0, windows.shape[1], chunk_size):
+        stop = min(start + chunk_size, windows.shape[1])
+        out[:, window - 1 + start:window - 1 + stop] = windows[:, start:stop].std(axis=-1, ddof=1)
+    return out
+
+
+def _smooth(values, period, alpha, start):
+    """
+    Exponential smoothing along the bar axis seeded, as talib does, with the
+    mean of the `period` values from `start`. Wilder smoothing uses alpha=1/period.
+    """
+    out = np.full(values.shape, np.nan)
+    seed = start + period - 1
+    if values.shape[1] <= seed:
+        return out
+    out[:, seed] = values[:, start:seed + 1].mean(axis=1)
+    for t in range(seed + 1, values.shape[1]):
+        out[:, t] = out[:, t - 1] + alpha * (values[:, t] - out[:, t - 1])
+    return out
+
+
+def _rsi(closes, period):
+    changes = np.zeros(closes.shape)
+    changes[:, 1:] = np.diff(closes, axis=1)
+    avg_gain = _smooth(np.maximum(changes, 0), period, 1 / period, 1)
+    avg_loss = _smooth(np.maximum(-changes, 0), period, 1 / period, 1)
+    total = avg_gain + avg_loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total != 0, 100 * avg_gain / total, np.where(np.isnan(total), np.nan, 0.0))
+
+
+def _atr(highs, lows, closes, period):
+    prev_close = closes[:, :-1]
+    true_range = np.zeros(closes.shape)
+    true_range[:, 1:] = np.maximum.reduce([
+        highs[:, 1:] - lows[:, 1:], np.abs(highs[:, 1:] - prev_close), np.abs(lows[:, 1:] - prev_close)
+    ])
+    return _smooth(true_range, period, 1 / period, 1)
+
+
+def _macd(closes, fast, slow, signal):
+    # Both EMAs start on the slow EMA's first bar, as in talib
+    fast_ema = _smooth(closes, fast, 2 / (fast + 1), slow - fast)
+    slow_ema = _smooth(closes, slow, 2 / (slow + 1), 0)
+    macd = fast_ema - slow_ema
+    macd_signal = np.full(closes.shape, np.nan)
+    if closes.shape[1] >= slow:
+        macd_signal[:, slow - 1:] = _smooth(macd[:, slow - 1:], signal, 2 / (signal + 1), 0)
+    macd[np.isnan(macd_signal)] = np.nan
+    return macd, macd_signal
+
+
+def _obv(closes, volumes):
+    direction = np.zeros(closes.shape)
+    direction[:, 1:] = np.sign(np.diff(closes, axis=1))
+    signed = direction * volumes
+    signed[:, 0] = volumes[:, 0]
+    return np.cumsum(signed, axis=1)
+
+class IndicatorEngine:
+    """
+    Incremental version of `add_technical_indicators` for one symbol. Each
+    closed bar updates the indicators in O(1) through the same Wilder/EMA
+    recurrences and running sums talib uses, so after n bars the features
+    equal talib's output over those n bars.
+    """
+    FEATURES = ('returns', 'volatility', 'rsi', 'macd', 'macd_signal', 'atr', 'sma20', 'sma50', 'obv')
+
+    def __init__(self, include_obv=True, rsi_period=14, atr_period=14, macd_fast=12, macd_slow=26,
+                 macd_signal=9, volatility_window=20, sma_periods=(20, 50)):
+        self.include_obv = include_obv
+        self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.volatility_window = volatility_window
+        self.sma_periods = tuple(sma_periods)
+        self.feature_names = self.FEATURES if include_obv else self.FEATURES[:-1]
+
+        self.count = 0
+        self.last_time = None
+        self.prev_close = np.nan
+        self.closes = deque(maxlen=max(self.sma_periods))
+        self.returns = deque(maxlen=volatility_window)
+        self.state = {
+            'sma_sums': (0.0,) * len(self.sma_periods),
+            'return_mean': 0.0, 'return_m2': 0.0,
+            'avg_gain': 0.0, 'avg_loss': 0.0,
+            'atr': 0.0,
+            'fast_ema': 0.0, 'slow_ema': 0.0,
+            'signal_ema': 0.0, 'macd_count': 0,
+            'obv': 0.0
+        }
+        self.features = np.full(len(self.feature_names), np.nan)
+
+    @property
+    def ready(self):
+        return not np.isnan(self.features).any()
+
+    def update(self, bar):
+        """Commits a closed bar (mapping with high/low/close and optionally volume) and returns the features."""
+        self.state, self.features, close_return = self._step(bar)
+        close = float(bar[column_key(bar, 'close')])
+        self.closes.append(close)
+        if not np.isnan(close_return):
+            self.returns.append(close_return)
+        self.prev_close = close
+        self.count += 1
+        return self.features
+
+    def peek(self, bar):
+        """Features as if `bar` were the next bar, without committing it (e.g. the still-forming bar)."""
+        return self._step(bar)[1]
+
+    def sync(self, market_data):
+        """
+        Feeds the closed bars of an MT5 frame that are newer than the last one
+        seen; the last row is the still-forming bar and is only peeked at.
+        Returns the feature vector for that last row.
+        """
+        times = column_array(market_data, 'Time')
+        start = 0 if self.last_time is None else int(np.searchsorted(times, self.last_time, side='right'))
+        columns = {
+            name: column_array(market_data, name, np.float64)
+            for name in ('high', 'low', 'close', 'volume') if has_column(market_data, name)
+        }
+
+        for i in range(start, len(times) - 1):
+            self.update({name: values[i] for name, values in columns.items()})
+            self.last_time = times[i]
+        return self.peek({name: values[-1] for name, values in columns.items()})
+
+    def _step(self, bar):
+        high, low, close = (float(bar[column_key(bar, name)]) for name in ('high', 'low', 'close'))
+        n = self.count  # index of this bar
+        prev_close = self.prev_close
+        state = dict(self.state)
+
+        # Simple moving averages
+        sma_sums, smas = [], []
+        for period, total in zip(self.sma_periods, state['sma_sums']):
+            total += close
+            if n >= period:
+                total -= self.closes[-period]
+            sma_sums.append(total)
+            smas.append(total / period if n >= period - 1 else np.nan)
+        state['sma_sums'] = tuple(sma_sums)
+
+        # Returns and their rolling sample std (sliding Welford)
+        close_return = close / prev_close - 1 if n > 0 else np.nan
+        volatility = np.nan
+        if n > 0:
+            window = self.volatility_window
+            mean, m2 = state['return_mean'], state['return_m2']
+            if len(self.returns) < window:
+                count = len(self.returns) + 1
+                delta = close_return - mean
+                mean += delta / count
+                m2 += delta * (close_return - mean)
+            else:
+                count = window
+                old = self.returns[0]
+                new_mean = mean + (close_return - old) / window
+                m2 += (close_return - old) * (close_return - new_mean + old - mean)
+                mean = new_mean
+            state['return_mean'], state['return_m2'] = mean, max(m2, 0.0)
+            if count == window:
+                volatility = np.sqrt(state['return_m2'] / (window - 1))
+
+        # RSI: average of the first period changes, then Wilder smoothing
+        rsi = np.nan
+        if n > 0:
+            change = close - prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            period = self.rsi_period
+            if n < period:
+                state['avg_gain'] += gain
+                state['avg_loss'] += loss
+            elif n == period:
+                state['avg_gain'] = (state['avg_gain'] + gain) / period
+                state['avg_loss'] = (state['avg_loss'] + loss) / period
+            else:
+                state['avg_gain'] = (state['avg_gain'] * (period - 1) + gain) / period
+                state['avg_loss'] = (state['avg_loss'] * (period - 1) + loss) / period
+            if n >= period:
+                total = state['avg_gain'] + state['avg_loss']
+                rsi = 100 * state['avg_gain'] / total if total != 0 else 0.0
+
+        # ATR: mean of the first period true ranges, then Wilder smoothing
+        atr = np.nan
+        if n > 0:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            period = self.atr_period
+            if n < period:
+                state['atr'] += true_range
+            elif n == period:
+                state['atr'] = (state['atr'] + true_range) / period
+            else:
+                state['atr'] = (state['atr'] * (period - 1) + true_range) / period
+            if n >= period:
+                atr = state['atr']
+
+        # MACD: like talib, both EMAs are seeded with an SMA ending on the slow EMA's first bar
+        macd = macd_signal = np.nan
+        fast, slow = self.macd_fast, self.macd_slow
+        if n < slow:
+            state['slow_ema'] += close
+            if n >= slow - fast:
+                state['fast_ema'] += close
+            if n == slow - 1:
+                state['slow_ema'] /= slow
+                state['fast_ema'] /= fast
+        else:
+            state['fast_ema'] += (close - state['fast_ema']) * 2 / (fast + 1)
+            state['slow_ema'] += (close - state['slow_ema']) * 2 / (slow + 1)
+        if n >= slow - 1:
+            macd = state['fast_ema'] - state['slow_ema']
+            period = self.macd_signal
+            state['macd_count'] += 1
+            if state['macd_count'] < period:
+                state['signal_ema'] += macd
+            elif state['macd_count'] == period:
+                state['signal_ema'] = (state['signal_ema'] + macd) / period
+            else:
+                state['signal_ema'] += (macd - state['signal_ema']) * 2 / (period + 1)
+            if state['macd_count'] >= period:
+                macd_signal = state['signal_ema']
+            else:
+                # talib only reports the MACD line once the signal line exists
+                macd = np.nan
+
+        features = [close_return, volatility, rsi, macd, macd_signal, atr] + smas
+        if self.include_obv:
+            volume = float(bar[column_key(bar, 'volume')])
+            if n == 0:
+                state['obv'] = volume
+            elif close > prev_close:
+                state['obv'] += volume
+            elif close < prev_close:
+                state['obv'] -= volume
+            features.append(state['obv'])
+
+        return state, np.array(features, dtype=np.float64), close_return
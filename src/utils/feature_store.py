@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from src.utils.feature_engineering import CUMULATIVE_FEATURES, FEATURE_SET_VERSION, add_technical_indicators
+
+
+class FeatureStore:
+    """
+    On-disk store of computed feature columns keyed by symbol, timeframe and
+    feature-set version. Each column is a `.npy` file that is memory-mapped on
+    read, so years of features open without parsing CSVs or recomputing
+    indicators. New bars are appended to the existing files in place.
+
+    Layout: <root>/<symbol>/<timeframe>/v<version>/{meta.json, <column>.npy}
+    """
+    def __init__(self, root='data/features'):
+        self.root = root
+
+    def path(self, symbol, timeframe, version=FEATURE_SET_VERSION):
+        return os.path.join(self.root, str(symbol), str(timeframe), f'v{version}')
+
+    def exists(self, symbol, timeframe, version=FEATURE_SET_VERSION):
+        return os.path.exists(os.path.join(self.path(symbol, timeframe, version), 'meta.json'))
+
+    def metadata(self, symbol, timeframe, version=FEATURE_SET_VERSION):
+        with open(os.path.join(self.path(symbol, timeframe, version), 'meta.json'), 'r') as file:
+            return json.load(file)
+
+    def load(self, symbol, timeframe, version=FEATURE_SET_VERSION, columns=None):
+        """Read-only memory maps of the stored columns, cut to the committed row count."""
+        meta = self.metadata(symbol, timeframe, version)
+        path = self.path(symbol, timeframe, version)
+        columns = meta['columns'] if columns is None else columns
+        return {
+            column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')[:meta['rows']]
+            for column in columns
+        }
+
+    def read(self, symbol, timeframe, version=FEATURE_SET_VERSION, columns=None):
+        return pd.DataFrame(self.load(symbol, timeframe, version, columns), copy=False)
+
+    def write(self, symbol, timeframe, frame, version=FEATURE_SET_VERSION):
+        """Replaces the stored features with `frame`."""
+        path = self.path(symbol, timeframe, version)
+        os.makedirs(path, exist_ok=True)
+        for column in frame.columns:
+            np.save(os.path.join(path, f'{column}.npy'), _column_values(frame, column))
+        self._write_metadata(path, frame, len(frame))
+
+    def append(self, symbol, timeframe, frame, version=FEATURE_SET_VERSION):
+        """
+        Appends the rows of `frame` newer than the last stored time (all rows if
+        the store has no time column). Returns the number of rows appended.
+        """
+        if not self.exists(symbol, timeframe, version):
+            self.write(symbol, timeframe, frame, version)
+            return len(frame)
+
+        meta = self.metadata(symbol, timeframe, version)
+        if list(frame.columns) != meta['columns']:
+            raise ValueError(f"Columns {list(frame.columns)} do not match stored columns {meta['columns']}")
+
+        time_column = meta['time_column']
+        if time_column is not None and meta['rows'] > 0:
+            last_time = self.load(symbol, timeframe, version, [time_column])[time_column][-1]
+            frame = frame[_column_values(frame, time_column) > last_time]
+        if frame.empty:
+            return 0
+
+        path = self.path(symbol, timeframe, version)
+        rows = meta['rows'] + len(frame)
+        for column in frame.columns:
+            _append_npy(os.path.join(path, f'{column}.npy'), _column_values(frame, column), meta['rows'])
+        # The row count is committed last, so an interrupted append is ignored by readers
+        self._write_metadata(path, frame, rows)
+        return len(frame)
+
+    def update(self, symbol, timeframe, raw_data, compute=add_technical_indicators,
+               version=FEATURE_SET_VERSION, warmup=500):
+        """
+        Computes features for the bars of `raw_data` that are not stored yet and
+        appends them. Indicators of the new bars are warmed up on the last
+        `warmup` stored rows, which is long enough for the EMA/Wilder recurrences
+        to match a full recompute; cumulative features such as OBV are shifted
+        to continue from their last stored value. Raw columns are matched to
+        stored ones case-insensitively (`Close` to `close`). Returns the stored
+        features as a DataFrame.
+        """
+        if not self.exists(symbol, timeframe, version):
+            self.write(symbol, timeframe, compute(raw_data.copy()), version)
+            return self.read(symbol, timeframe, version)
+
+        meta = self.metadata(symbol, timeframe, version)
+        stored = self.load(symbol, timeframe, version)
+        raw_data = raw_data.rename(columns=_stored_names(raw_data.columns, stored))
+        time_column = meta['time_column']
+        if time_column is None or time_column not in raw_data:
+            raise ValueError("Incremental updates need a time column in both the store and the raw data")
+
+        last_time = stored[time_column][-1]
+        raw_data = raw_data.assign(**{time_column: _column_values(raw_data, time_column)})
+        new_rows = raw_data[raw_data[time_column].to_numpy() > last_time]
+        if not new_rows.empty:
+            history = pd.DataFrame({
+                column: np.asarray(stored[column][-warmup:]) for column in raw_data.columns if column in stored
+            })
+            features = compute(pd.concat([history, new_rows], ignore_index=True))
+            times = _column_values(features, time_column)
+            for column in CUMULATIVE_FEATURES:
+                if column in features and column in stored:
+                    # Recomputed from the start of the warm-up; offset so the last stored row keeps its value
+                    anchor = features[column].to_numpy()[times == last_time]
+                    if len(anchor):
+                        features[column] += stored[column][-1] - anchor[-1]
+            features = features[times > last_time]
+            self.append(symbol, timeframe, features[meta['columns']], version)
+        return self.read(symbol, timeframe, version)
+
+    def _write_metadata(self, path, frame, rows):
+        time_column = next((column for column in ('time', 'Time') if column in frame.columns), None)
+        meta = {
+            'columns': list(frame.columns),
+            'dtypes': {column: _column_values(frame, column).dtype.str for column in frame.columns},
+            'rows': rows,
+            'time_column': time_column,
+            'updated': time.time()
+        }
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(meta, file)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+
+def _column_values(frame, column):
+    """Column as a NumPy array; object columns of timestamps (e.g. ISO strings from a CSV) become datetime64."""
+    values = frame[column].to_numpy()
+    if values.dtype == object:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)  # format inference fallback on non-date columns
+                times = pd.to_datetime(frame[column])
+        except (ValueError, TypeError) as error:
+            raise TypeError(f"Column {column!r} has object dtype and cannot be stored") from error
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert(None)
+        values = times.to_numpy()
+    return values
+
+
+def _stored_names(columns, stored):
+    """Renames for raw columns that match a stored column up to case and are not present as stored."""
+    by_lower = {name.lower(): name for name in stored}
+    return {
+        column: by_lower[column.lower()] for column in columns
+        if column.lower() in by_lower and column != by_lower[column.lower()] and by_lower[column.lower()] not in columns
+    }
+
+
+def _append_npy(filename, values, rows):
+    """
+    Appends `values` to a 1-D .npy file holding `rows` committed rows by writing
+    the data after them and rewriting the shape in the header in place. NumPy
+    pads headers so the shape can grow; if it cannot, the file is rewritten.
+    """
+    with open(filename, 'r+b') as file:
+        version = np.lib.format.read_magic(file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        _, fortran_order, dtype = read_header(file)
+        data_offset = file.tell()
+
+        values = np.ascontiguousarray(values, dtype=dtype)
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': fortran_order,
+            'shape': (rows + len(values),)
+        })
+        prefix_length = 10 if version == (1, 0) else 12
+        header_length = data_offset - prefix_length
+        if len(header) + 1 > header_length:
+            stored = np.load(filename)[:rows]
+            file.close()
+            np.save(filename, np.concatenate([stored, values]))
+            return
+
+        file.seek(data_offset + rows * dtype.itemsize)
+        file.write(values.tobytes())
+        file.truncate()
+        file.seek(prefix_length)
+        file.write((header.ljust(header_length - 1) + '\n').encode('latin1'))
@@ -1,3 +1,5 @@
+import numpy as np
+
 def calculate_risk_percentage(account_balance, risk_per_trade):
     return account_balance * (risk_per_trade / 100)
 
@@ -27,4 +29,17 @@ def is_trade_time(current_time, trading_hours):
     return False
 
 def round_to_nearest(value, nearest):
-    return round(value / nearest) * nearest
\ No newline at end of file
+    return round(value / nearest) * nearest
+
+def column_key(data, name):
+    # Backtest frames use capitalised columns, raw MT5 frames lowercase ones; works for frames, dicts and rows
+    for key in (name, name.lower(), name.capitalize()):
+        if key in data:
+            return key
+    raise KeyError(name)
+
+def has_column(data, name):
+    return any(key in data for key in (name, name.lower(), name.capitalize()))
+
+def column_array(data, name, dtype=None):
+    return np.asarray(data[column_key(data, name)], dtype=dtype)